@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Model Export Script
+
+Exports the player and ball YOLO models to TensorRT engines (or ONNX models
+for ONNX Runtime) once, offline. The trackers pick up a `.engine` or `.onnx`
+file sitting next to the `.pt` weights automatically and fall back to the
+weights when neither exists.
+
+INT8 needs a calibration dataset; the ball model is calibrated on the tennis
+ball training set. Validate the INT8 mAP against FP16 before keeping it.
+"""
+
+import argparse
+from ultralytics import YOLO
+
+PLAYER_MODEL_PATH = 'yolov8x.pt'
+BALL_MODEL_PATH = 'models/yolo5_last.pt'
+BALL_CALIBRATION_DATA = 'training/tennis-ball-detection-6/data.yaml'
+
+
+def export_onnx(model_path, batch=32, imgsz=640):
+    """
+    Export a YOLO model to ONNX with a dynamic batch dimension. ultralytics
+    runs it through a single ONNX Runtime session reused for every call.
+
+    Args:
+        model_path (str): Path to the .pt weights
+        batch (int): Batch size used to trace the model
+        imgsz (int): Inference image size
+
+    Returns:
+        str: Path of the exported model
+    """
+    model = YOLO(model_path)
+    return model.export(format='onnx', dynamic=True, simplify=True, batch=batch, imgsz=imgsz)
+
+
+def export_engine(model_path, precision='fp16', batch=32, imgsz=640, data=None):
+    """
+    Export a YOLO model to a TensorRT engine with a dynamic batch dimension.
+
+    Args:
+        model_path (str): Path to the .pt weights
+        precision (str): 'fp16' or 'int8'
+        batch (int): Max batch size the engine accepts
+        imgsz (int): Inference image size
+        data (str): Dataset yaml used for INT8 calibration
+
+    Returns:
+        str: Path of the exported engine
+    """
+    model = YOLO(model_path)
+    return model.export(format='engine',
+                        half=precision == 'fp16',
+                        int8=precision == 'int8',
+                        dynamic=True,
+                        batch=batch,
+                        imgsz=imgsz,
+                        data=data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the tennis YOLO models to TensorRT engines or ONNX')
+    parser.add_argument('--format', default='engine', choices=['engine', 'onnx'],
+                        help='Export format (default: engine)')
+    parser.add_argument('--player-precision', default='fp16', choices=['fp16', 'int8'],
+                        help='Precision of the player engine (default: fp16)')
+    parser.add_argument('--ball-precision', default='fp16', choices=['fp16', 'int8'],
+                        help='Precision of the ball engine (default: fp16)')
+    parser.add_argument('--batch', type=int, default=32,
+                        help='Max batch size of the engines (default: 32)')
+    parser.add_argument('--imgsz', type=int, default=640,
+                        help='Inference image size of the player model (default: 640)')
+    parser.add_argument('--ball-imgsz', type=int, default=416,
+                        help='Inference image size of the ball model (default: 416)')
+
+    args = parser.parse_args()
+
+    if args.format == 'onnx':
+        print("Exporting player model (onnx)...")
+        print(f"✓ Player model saved to {export_onnx(PLAYER_MODEL_PATH, args.batch, args.imgsz)}")
+        print("Exporting ball model (onnx)...")
+        print(f"✓ Ball model saved to {export_onnx(BALL_MODEL_PATH, args.batch, args.ball_imgsz)}")
+        return
+
+    print(f"Exporting player model ({args.player_precision})...")
+    player_engine = export_engine(PLAYER_MODEL_PATH, args.player_precision, args.batch, args.imgsz)
+    print(f"✓ Player engine saved to {player_engine}")
+
+    print(f"Exporting ball model ({args.ball_precision})...")
+    ball_engine = export_engine(BALL_MODEL_PATH, args.ball_precision, args.batch, args.ball_imgsz,
+                                data=BALL_CALIBRATION_DATA if args.ball_precision == 'int8' else None)
+    print(f"✓ Ball engine saved to {ball_engine}")
+
+
+if __name__ == "__main__":
+    main()
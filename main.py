@@ -9,26 +9,41 @@ DEBUGGING SUMMARY:
 - Fixed index out of range in player stats drawing by adding bounds checking
 - Fixed PyTorch deprecation warning in court_line_detector.py
 
-The script now runs successfully on limited frames. To process full video, 
-increase max_frames or set to None (but may require more memory).
+Frames are streamed from disk in batches through detection and drawing, so
+memory no longer grows with the number of frames processed. To process the
+full video, widen the start/end time window.
+
+Player and ball detection are compute-bound on the GPU and dominate the run
+time; the per-frame post-processing after them (box filtering, player
+selection, stats) is small, memory-bound work kept on NumPy arrays.
 """
 
-from utils import (read_video, 
-                   save_video,
-                   read_video_limited,
-                   read_video_sampled,
+from utils import (read_video_sampled,
+                   iter_video_sampled,
+                   batch_frames,
+                   prefetch,
+                   BackgroundVideoWriter,
+                   open_video_writer,
+                   read_stub,
+                   save_stub,
+                   get_stub_key,
+                   get_file_fingerprint,
+                   save_detections_npz,
+                   read_detections_npz,
                    get_video_info,
-                   measure_distance,
-                   draw_player_stats,
-                   convert_pixel_distance_to_meters
+                   get_court_roi,
+                   export_engine_if_missing,
+                   draw_player_stats_frame,
+                   get_player_stats_data,
+                   expand_player_stats_to_frames
                    )
-import constants
 from trackers import PlayerTracker,BallTracker
 from court_line_detector import CourtLineDetector
 from mini_court import MiniCourt
 import cv2
-import pandas as pd
-from copy import deepcopy
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 
 def main():
@@ -47,81 +62,130 @@ def main():
         start_frame = int(start_time_seconds * fps)  # Frame 625
         end_frame = int(end_time_seconds * fps)      # Frame 875
         frame_step = 5  # Process every 5th frame for detailed analysis
+        keyframe_stride = 1  # Run the player model on every processed frame; >1 interpolates the frames in between
         
         print(f"Extracting frames from {start_time_seconds}s to {end_time_seconds}s")
         print(f"Frame range: {start_frame} to {end_frame} (every {frame_step}th frame)")
         
-        video_frames = read_video_sampled(input_video_path, frame_step=frame_step, 
-                                         max_frames=None, start_frame=start_frame, end_frame=end_frame)
-        print(f"Successfully read {len(video_frames)} frames from the action sequence")
-        
-        # Calculate which original frame numbers we're processing
-        sampled_frame_numbers = list(range(start_frame, min(end_frame, start_frame + len(video_frames) * frame_step), frame_step))
-        print(f"Processing frame numbers: {sampled_frame_numbers[:5]}...{sampled_frame_numbers[-5:]} (showing first 5 and last 5)")
+        # Frames are streamed from disk twice (detection, then drawing) instead
+        # of being held in memory for the whole run
+        video_read_args = {'frame_step': frame_step, 'start_frame': start_frame, 'end_frame': end_frame}
+        first_frame = read_video_sampled(input_video_path, max_frames=1, **video_read_args)[0]
+
+        # ultralytics downloads yolov8x.pt to the working directory on the first run
+        player_model_path = 'yolov8x.pt'
+        ball_model_path = 'models/yolo5_last.pt'
+        court_model_path = "models/keypoints_model.pth"
 
         # Detect Players and Ball
+        batch_size = 16  # Frames per YOLO call, tune to available VRAM
         print("Initializing trackers...")
-        player_tracker = PlayerTracker(model_path='yolov8x')
-        ball_tracker = BallTracker(model_path='models/yolo5_last.pt')
+        # TensorRT engines are built once on CUDA hosts and reused on later runs
+        # Each detector gets a CUDA stream of its own, they run on separate threads below
+        player_tracker = PlayerTracker(model_path=export_engine_if_missing(player_model_path, imgsz=640), imgsz=640,
+                                       batch_size=batch_size, use_cuda_stream=True)
+        ball_tracker = BallTracker(model_path=export_engine_if_missing(ball_model_path, imgsz=416), imgsz=416,
+                                   batch_size=batch_size, use_cuda_stream=True)
         print("Trackers initialized successfully")
 
-        print("Detecting players...")
-        player_detections = player_tracker.detect_frames(video_frames,
-                                                         read_from_stub=False,
-                                                         stub_path="tracker_stubs/player_detections.pkl"
-                                                         )
-        print("Player detection completed")
+        # Stubs are keyed by the model and the processed clip so reruns on the same
+        # clip skip inference, and a different model never reads stale results. The
+        # video and the model files the trackers actually load (an exported engine
+        # when there is one) are fingerprinted, so replacing one at the same path
+        # also misses; so do changed inference settings
+        clip_key = (get_file_fingerprint(input_video_path), start_frame, end_frame, frame_step)
+        player_model_key = get_stub_key(get_file_fingerprint(player_tracker.model_path),
+                                        player_tracker.imgsz, player_tracker.half, player_tracker.conf)
+        ball_model_key = get_stub_key(get_file_fingerprint(ball_tracker.model_path),
+                                      ball_tracker.imgsz, ball_tracker.half, ball_tracker.conf)
+        player_detections_key = get_stub_key(player_model_key, *clip_key, keyframe_stride)
+        player_stub_path = f"tracker_stubs/player_detections_{player_detections_key}.npz"
+        ball_stub_path = f"tracker_stubs/ball_detections_{get_stub_key(ball_model_key, *clip_key)}.npz"
+        court_keypoints_stub_path = f"tracker_stubs/court_keypoints_{get_stub_key(get_file_fingerprint(court_model_path), *clip_key)}.pkl"
+        # The player choice is derived from exactly those detections; the version tag
+        # invalidates cached choices when the selection heuristic changes
+        chosen_players_stub_path = f"tracker_stubs/chosen_players_{get_stub_key(player_detections_key, 'v1')}.pkl"
+
+        # Court Line Detector model
+        print("Initializing court line detector...")
+        court_line_detector = CourtLineDetector(court_model_path)
+        if os.path.exists(court_keypoints_stub_path):
+            print(f"Reading cached court keypoints from {court_keypoints_stub_path}")
+            court_keypoints = read_stub(court_keypoints_stub_path)
+        else:
+            print("Predicting court keypoints...")
+            court_keypoints = court_line_detector.predict(first_frame)
+            save_stub(court_keypoints, court_keypoints_stub_path)
+            print("Court keypoints prediction completed")
+
+        # Player detection is skipped on frames where nothing moved around the court
+        court_roi = get_court_roi(court_keypoints, first_frame.shape)
+
+        if os.path.exists(player_stub_path) and os.path.exists(ball_stub_path):
+            print(f"Reading cached detections from {player_stub_path} and {ball_stub_path}")
+            player_detections = read_detections_npz(player_stub_path)
+            ball_detections = read_detections_npz(ball_stub_path)
+        else:
+            print("Detecting players and ball...")
+            player_detections = []
+            ball_detections = []
+            player_tracker.reset_clip_state()
+            # The next batch is decoded on a background thread while the current one is on the GPU.
+            # The two models run on their own threads so one's pre/post-processing overlaps
+            # the other's forward pass
+            with ThreadPoolExecutor(max_workers=2) as detector_executor:
+                for frame_batch in prefetch(batch_frames(iter_video_sampled(input_video_path, **video_read_args), batch_size)):
+                    player_future = detector_executor.submit(player_tracker.detect_frames, frame_batch, change_roi=court_roi,
+                                                             keyframe_stride=keyframe_stride)
+                    ball_future = detector_executor.submit(ball_tracker.detect_frames, frame_batch)
+                    player_detections.extend(player_future.result())
+                    ball_detections.extend(ball_future.result())
+            # Players move smoothly across the frames skipped by the key frame stride
+            player_detections = player_tracker.interpolate_skipped_frames(player_detections)
+            save_detections_npz(player_detections, player_stub_path)
+            save_detections_npz(ball_detections, ball_stub_path)
+            # A cached player choice belongs to the previous detections
+            if os.path.exists(chosen_players_stub_path):
+                os.remove(chosen_players_stub_path)
+        num_frames = len(player_detections)
+        print(f"Player and ball detection completed on {num_frames} frames from the action sequence")
         
-        print("Detecting ball...")
-        ball_detections = ball_tracker.detect_frames(video_frames,
-                                                         read_from_stub=False,
-                                                         stub_path="tracker_stubs/ball_detections.pkl"
-                                                         )
-        print("Ball detection completed")
+        # Calculate which original frame numbers we're processing
+        sampled_frame_numbers = list(range(start_frame, min(end_frame, start_frame + num_frames * frame_step), frame_step))
+        print(f"Processing frame numbers: {sampled_frame_numbers[:5]}...{sampled_frame_numbers[-5:]} (showing first 5 and last 5)")
         
         print("Interpolating ball positions...")
         ball_detections = ball_tracker.interpolate_ball_positions(ball_detections)
         print("Ball interpolation completed")
         
-        # Court Line Detector model
-        print("Initializing court line detector...")
-        court_model_path = "models/keypoints_model.pth"
-        court_line_detector = CourtLineDetector(court_model_path)
-        print("Predicting court keypoints...")
-        court_keypoints = court_line_detector.predict(video_frames[0])
-        print("Court keypoints prediction completed")
-
         # choose players
         print("Choosing and filtering players...")
-        player_detections = player_tracker.choose_and_filter_players(court_keypoints, player_detections)
+        if os.path.exists(chosen_players_stub_path):
+            initial_chosen_players = read_stub(chosen_players_stub_path)
+        else:
+            initial_chosen_players = player_tracker.choose_initial_players(court_keypoints, player_detections)
+            save_stub(initial_chosen_players, chosen_players_stub_path)
+        player_detections = player_tracker.choose_and_filter_players(court_keypoints, player_detections, initial_chosen_players)
         print("Player filtering completed")
 
         # Calculate player detection statistics AFTER filtering
         print("\n=== FILTERED PLAYER DETECTION STATISTICS ===")
         total_frames = len(player_detections)
-        frames_with_0_players = 0
-        frames_with_1_player = 0
-        frames_with_2_players = 0
-        frames_with_3plus_players = 0
-        
-        for frame_idx, player_dict in enumerate(player_detections):
-            num_players = len(player_dict)
-            if num_players == 0:
-                frames_with_0_players += 1
-            elif num_players == 1:
-                frames_with_1_player += 1
-            elif num_players == 2:
-                frames_with_2_players += 1
-            else:
-                frames_with_3plus_players += 1
-                
-            # Show detailed examples of filtered player detection patterns
-            if frame_idx < 15 or (frame_idx % 10 == 0):
-                original_frame_num = sampled_frame_numbers[frame_idx] if frame_idx < len(sampled_frame_numbers) else frame_idx
-                player_ids = list(player_dict.keys())
-                print(f"  Frame {original_frame_num}: {num_players} players detected - IDs: {player_ids}")
+        player_counts = np.fromiter((len(player_dict) for player_dict in player_detections), dtype=np.int64, count=total_frames)
+        frames_with_0_players, frames_with_1_player, frames_with_2_players, frames_with_3plus_players = \
+            np.bincount(np.minimum(player_counts, 3), minlength=4).tolist()
+
+        # Show detailed examples of filtered player detection patterns
+        sample_frame_indices = list(range(min(15, total_frames))) + list(range(20, total_frames, 10))
+        example_lines = []
+        for frame_idx in sample_frame_indices:
+            original_frame_num = sampled_frame_numbers[frame_idx] if frame_idx < len(sampled_frame_numbers) else frame_idx
+            player_ids = list(player_detections[frame_idx].keys())
+            example_lines.append(f"  Frame {original_frame_num}: {player_counts[frame_idx]} players detected - IDs: {player_ids}")
+        if example_lines:
+            print("\n".join(example_lines))
         
-        print(f"\nFILTERED Detection Quality Summary:")
+        print("\nFILTERED Detection Quality Summary:")
         print(f"  Total frames analyzed: {total_frames}")
         print(f"  Frames with 0 players: {frames_with_0_players} ({frames_with_0_players/total_frames*100:.1f}%)")
         print(f"  Frames with 1 player:  {frames_with_1_player} ({frames_with_1_player/total_frames*100:.1f}%)")
@@ -141,7 +205,7 @@ def main():
         
         # MiniCourt
         print("Initializing mini court...")
-        mini_court = MiniCourt(video_frames[0]) 
+        mini_court = MiniCourt(first_frame)
         print("Mini court initialized")
 
         # Detect ball shots
@@ -157,144 +221,55 @@ def main():
         print("Position conversion completed")
 
         print("Calculating player statistics...")
-        player_stats_data = [{
-            'frame_num':0,
-            'player_1_number_of_shots':0,
-            'player_1_total_shot_speed':0,
-            'player_1_last_shot_speed':0,
-            'player_1_total_player_speed':0,
-            'player_1_last_player_speed':0,
-
-            'player_2_number_of_shots':0,
-            'player_2_total_shot_speed':0,
-            'player_2_last_shot_speed':0,
-            'player_2_total_player_speed':0,
-            'player_2_last_player_speed':0,
-        } ]
-        
-        for ball_shot_ind in range(len(ball_shot_frames)-1):
-            start_frame = ball_shot_frames[ball_shot_ind]
-            end_frame = ball_shot_frames[ball_shot_ind+1]
-            
-            # Skip if frames are beyond our limited frame range
-            if start_frame >= len(video_frames) or end_frame >= len(video_frames):
-                continue
-            
-            # Skip if we don't have player data for these frames
-            if (start_frame >= len(player_mini_court_detections) or 
-                end_frame >= len(player_mini_court_detections) or
-                len(player_mini_court_detections[start_frame]) == 0 or
-                len(player_mini_court_detections[end_frame]) == 0):
-                print(f"Skipping frames {start_frame}-{end_frame}: insufficient player data")
-                continue
-                
-            ball_shot_time_in_seconds = (end_frame-start_frame)/24 # 24fps
-
-            # Get distance covered by the ball
-            distance_covered_by_ball_pixels = measure_distance(ball_mini_court_detections[start_frame][1],
-                                                               ball_mini_court_detections[end_frame][1])
-            distance_covered_by_ball_meters = convert_pixel_distance_to_meters( distance_covered_by_ball_pixels,
-                                                                               constants.DOUBLE_LINE_WIDTH,
-                                                                               mini_court.get_width_of_mini_court()
-                                                                               ) 
-
-            # Speed of the ball shot in km/h
-            speed_of_ball_shot = distance_covered_by_ball_meters/ball_shot_time_in_seconds * 3.6
-
-            # player who the ball
-            player_positions = player_mini_court_detections[start_frame]
-            if not player_positions:
-                print(f"Skipping frame {start_frame}: no player positions")
-                continue
-                
-            player_shot_ball = min( player_positions.keys(), key=lambda player_id: measure_distance(player_positions[player_id],
-                                                                                                     ball_mini_court_detections[start_frame][1]))
-
-            # opponent player speed - need to handle case where we don't have both players
-            available_players = list(player_positions.keys())
-            if len(available_players) < 2:
-                print(f"Skipping frame {start_frame}: only {len(available_players)} players detected")
-                continue
-            
-            # Find the opponent player ID
-            opponent_player_id = None
-            for pid in available_players:
-                if pid != player_shot_ball:
-                    opponent_player_id = pid
-                    break
-            
-            if opponent_player_id is None:
-                print(f"Skipping frame {start_frame}: could not find opponent player")
-                continue
-            
-            # Check if opponent exists in both frames
-            if (opponent_player_id not in player_mini_court_detections[start_frame] or
-                opponent_player_id not in player_mini_court_detections[end_frame]):
-                print(f"Skipping frame {start_frame}: opponent player {opponent_player_id} not in both frames")
-                continue
-            
-            distance_covered_by_opponent_pixels = measure_distance(player_mini_court_detections[start_frame][opponent_player_id],
-                                                                    player_mini_court_detections[end_frame][opponent_player_id])
-            distance_covered_by_opponent_meters = convert_pixel_distance_to_meters( distance_covered_by_opponent_pixels,
-                                                                               constants.DOUBLE_LINE_WIDTH,
-                                                                               mini_court.get_width_of_mini_court()
-                                                                               ) 
-
-            speed_of_opponent = distance_covered_by_opponent_meters/ball_shot_time_in_seconds * 3.6
-
-            # Map player IDs to 1 and 2 for statistics (since our stats structure expects player_1 and player_2)
-            available_player_ids = sorted(list(player_positions.keys()))
-            player_id_mapping = {available_player_ids[i]: i+1 for i in range(min(2, len(available_player_ids)))}
-            
-            mapped_player_shot_ball = player_id_mapping.get(player_shot_ball, 1)
-            mapped_opponent_player_id = player_id_mapping.get(opponent_player_id, 2)
-            
-            current_player_stats= deepcopy(player_stats_data[-1])
-            current_player_stats['frame_num'] = start_frame
-            current_player_stats[f'player_{mapped_player_shot_ball}_number_of_shots'] += 1
-            current_player_stats[f'player_{mapped_player_shot_ball}_total_shot_speed'] += speed_of_ball_shot
-            current_player_stats[f'player_{mapped_player_shot_ball}_last_shot_speed'] = speed_of_ball_shot
-
-            current_player_stats[f'player_{mapped_opponent_player_id}_total_player_speed'] += speed_of_opponent
-            current_player_stats[f'player_{mapped_opponent_player_id}_last_player_speed'] = speed_of_opponent
-
-            player_stats_data.append(current_player_stats)
+        # Consecutive processed frames are frame_step source frames apart
+        player_stats_data_df = get_player_stats_data(ball_shot_frames,
+                                                     player_mini_court_detections,
+                                                     ball_mini_court_detections,
+                                                     mini_court.get_width_of_mini_court(),
+                                                     fps=fps / frame_step
+                                                     )
 
         print("Creating player statistics dataframe...")
-        player_stats_data_df = pd.DataFrame(player_stats_data)
-        frames_df = pd.DataFrame({'frame_num': list(range(len(video_frames)))})
-        player_stats_data_df = pd.merge(frames_df, player_stats_data_df, on='frame_num', how='left')
-        player_stats_data_df = player_stats_data_df.ffill()
+        player_stats_data_df = expand_player_stats_to_frames(player_stats_data_df, num_frames)
 
-        # Fix the average speed calculations - there were bugs in the original code
-        player_stats_data_df['player_1_average_shot_speed'] = player_stats_data_df['player_1_total_shot_speed']/player_stats_data_df['player_1_number_of_shots'].replace(0, 1)
-        player_stats_data_df['player_2_average_shot_speed'] = player_stats_data_df['player_2_total_shot_speed']/player_stats_data_df['player_2_number_of_shots'].replace(0, 1)
-        player_stats_data_df['player_1_average_player_speed'] = player_stats_data_df['player_1_total_player_speed']/player_stats_data_df['player_1_number_of_shots'].replace(0, 1)
-        player_stats_data_df['player_2_average_player_speed'] = player_stats_data_df['player_2_total_player_speed']/player_stats_data_df['player_2_number_of_shots'].replace(0, 1)
+        print("Drawing and saving output video...")
+        # Decode, draw and encode run on three threads connected by bounded queues
+        # Size and frame rate come from the video_info read at the start, not from defaults
+        video_writer = BackgroundVideoWriter(open_video_writer("output_videos/output_video.mp4",
+                                                               (video_info['width'], video_info['height']),
+                                                               fps))
+        player_stats_rows = player_stats_data_df.to_dict('records')
 
-        print("Drawing output frames...")
-        # Draw output
-        ## Draw Player Bounding Boxes
-        output_video_frames= player_tracker.draw_bboxes(video_frames, player_detections)
-        output_video_frames= ball_tracker.draw_bboxes(output_video_frames, ball_detections)
+        # Each frame goes through every overlay while it is still hot in cache
+        def draw_frame(frame, frame_num):
+            ## Draw Player and Ball Bounding Boxes
+            player_tracker.draw_bbox(frame, player_detections[frame_num])
+            ball_tracker.draw_bbox(frame, ball_detections[frame_num])
 
-        ## Draw court Keypoints
-        output_video_frames  = court_line_detector.draw_keypoints_on_video(output_video_frames, court_keypoints)
+            ## Draw court Keypoints
+            court_line_detector.draw_keypoints(frame, court_keypoints)
 
-        # Draw Mini Court
-        output_video_frames = mini_court.draw_mini_court(output_video_frames)
-        output_video_frames = mini_court.draw_points_on_mini_court(output_video_frames,player_mini_court_detections)
-        output_video_frames = mini_court.draw_points_on_mini_court(output_video_frames,ball_mini_court_detections, color=(0,255,255))    
+            # Draw Mini Court
+            mini_court.draw_mini_court_frame(frame)
+            mini_court.draw_points(frame, player_mini_court_detections[frame_num])
+            mini_court.draw_points(frame, ball_mini_court_detections[frame_num], color=(0,255,255))
 
-        # Draw Player Stats
-        output_video_frames = draw_player_stats(output_video_frames,player_stats_data_df)
+            # Draw Player Stats
+            draw_player_stats_frame(frame, player_stats_rows[frame_num])
 
-        ## Draw frame number on top left corner
-        for i, frame in enumerate(output_video_frames):
-            cv2.putText(frame, f"Frame: {i}",(10,30),cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            ## Draw frame number on top left corner
+            cv2.putText(frame, f"Frame: {frame_num}",(10,30),cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            return frame
 
-        print("Saving output video...")
-        save_video(output_video_frames, "output_videos/output_video.avi")
+        # The OpenCV drawing calls release the GIL, so the frames of a batch are drawn in parallel
+        frame_offset = 0
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for frame_batch in prefetch(batch_frames(iter_video_sampled(input_video_path, **video_read_args), batch_size)):
+                frame_nums = range(frame_offset, frame_offset + len(frame_batch))
+                for frame in executor.map(draw_frame, frame_batch, frame_nums):
+                    video_writer.write(frame)
+                frame_offset += len(frame_batch)
+        video_writer.release()
         print("Analysis completed successfully!")
         
     except Exception as e:
@@ -5,13 +5,8 @@ sys.path.append('../')
 import constants
 from utils import (
     convert_meters_to_pixel_distance,
-    convert_pixel_distance_to_meters,
     get_foot_position,
-    get_closest_keypoint_index,
-    get_height_of_bbox,
-    measure_xy_distance,
-    get_center_of_bbox,
-    measure_distance
+    get_center_of_bbox
 )
 
 class MiniCourt():
@@ -101,8 +96,7 @@ class MiniCourt():
         self.court_drawing_width = self.court_end_x - self.court_start_x
 
     def set_canvas_background_box_position(self,frame):
-        frame= frame.copy()
-
+        # Only the frame size is needed, no copy of the pixels
         self.end_x = frame.shape[1] - self.buffer
         self.end_y = self.buffer + self.drawing_rectangle_height
         self.start_x = self.end_x - self.drawing_rectangle_width
@@ -128,22 +122,28 @@ class MiniCourt():
         return frame
 
     def draw_background_rectangle(self,frame):
-        shapes = np.zeros_like(frame,np.uint8)
-        # Draw the rectangle
-        cv2.rectangle(shapes, (self.start_x, self.start_y), (self.end_x, self.end_y), (255, 255, 255), cv2.FILLED)
-        out = frame.copy()
+        # Blend white into the rectangle only, in place, instead of building
+        # and blending full-frame mask images
+        # Both ends are clipped to the frame, negative ends would wrap the slice around
         alpha=0.5
-        mask = shapes.astype(bool)
-        out[mask] = cv2.addWeighted(frame, alpha, shapes, 1 - alpha, 0)[mask]
+        frame_height, frame_width = frame.shape[:2]
+        background = frame[min(max(self.start_y, 0), frame_height):min(max(self.end_y+1, 0), frame_height),
+                           min(max(self.start_x, 0), frame_width):min(max(self.end_x+1, 0), frame_width)]
+        if background.size:
+            white = np.full_like(background, 255)
+            cv2.addWeighted(background, alpha, white, 1 - alpha, 0, dst=background)
+
+        return frame
 
-        return out
+    def draw_mini_court_frame(self, frame):
+        # Draw the mini court onto one frame in place
+        frame = self.draw_background_rectangle(frame)
+        return self.draw_court(frame)
 
     def draw_mini_court(self,frames):
         output_frames = []
         for frame in frames:
-            frame = self.draw_background_rectangle(frame)
-            frame = self.draw_court(frame)
-            output_frames.append(frame)
+            output_frames.append(self.draw_mini_court_frame(frame))
         return output_frames
 
     def get_start_point_of_mini_court(self):
@@ -153,110 +153,60 @@ class MiniCourt():
     def get_court_drawing_keypoints(self):
         return self.drawing_key_points
 
-    def get_mini_court_coordinates(self,
-                                   object_position,
-                                   closest_key_point, 
-                                   closest_key_point_index, 
-                                   player_height_in_pixels,
-                                   player_height_in_meters
-                                   ):
-        
-        distance_from_keypoint_x_pixels, distance_from_keypoint_y_pixels = measure_xy_distance(object_position, closest_key_point)
-
-        # Conver pixel distance to meters
-        distance_from_keypoint_x_meters = convert_pixel_distance_to_meters(distance_from_keypoint_x_pixels,
-                                                                           player_height_in_meters,
-                                                                           player_height_in_pixels
-                                                                           )
-        distance_from_keypoint_y_meters = convert_pixel_distance_to_meters(distance_from_keypoint_y_pixels,
-                                                                                player_height_in_meters,
-                                                                                player_height_in_pixels
-                                                                          )
-        
-        # Convert to mini court coordinates
-        mini_court_x_distance_pixels = self.convert_meters_to_pixels(distance_from_keypoint_x_meters)
-        mini_court_y_distance_pixels = self.convert_meters_to_pixels(distance_from_keypoint_y_meters)
-        closest_mini_coourt_keypoint = ( self.drawing_key_points[closest_key_point_index*2],
-                                        self.drawing_key_points[closest_key_point_index*2+1]
-                                        )
-        
-        mini_court_player_position = (closest_mini_coourt_keypoint[0]+mini_court_x_distance_pixels,
-                                      closest_mini_coourt_keypoint[1]+mini_court_y_distance_pixels
-                                        )
-
-        return  mini_court_player_position
+    def get_court_homography(self, original_court_key_points):
+        # The 14 detected court keypoints and the 14 drawing keypoints describe
+        # the same court points, so one homography maps the video frame onto
+        # the mini court
+        source_points = np.asarray(original_court_key_points, dtype=np.float32).reshape(-1, 2)
+        destination_points = np.asarray(self.drawing_key_points, dtype=np.float32).reshape(-1, 2)
+        homography, _ = cv2.findHomography(source_points, destination_points)
+        # Degenerate keypoints from a bad court model prediction (e.g. collinear
+        # ones) give no homography, or a singular one that projects to infinity
+        if homography is None or not np.isfinite(homography).all() or np.linalg.matrix_rank(homography) < 3:
+            raise ValueError("Could not fit a homography to the court keypoints, "
+                             "they are degenerate (e.g. collinear); check the court keypoint prediction")
+        return homography
 
     def convert_bounding_boxes_to_mini_court_coordinates(self,player_boxes, ball_boxes, original_court_key_points ):
-        player_heights = {
-            1: constants.PLAYER_1_HEIGHT_METERS,
-            2: constants.PLAYER_2_HEIGHT_METERS
-        }
-
-        output_player_boxes= []
-        output_ball_boxes= []
+        homography = self.get_court_homography(original_court_key_points)
 
+        # Collect every player foot position and ball center so they can be
+        # projected with a single perspectiveTransform call
+        player_points = []
         for frame_num, player_bbox in enumerate(player_boxes):
-            ball_box = ball_boxes[frame_num][1]
-            ball_position = get_center_of_bbox(ball_box)
-            
-            # Skip frames with no players detected
-            if not player_bbox:
-                output_player_boxes.append({})
-                output_ball_boxes.append({})
-                continue
-                
-            closest_player_id_to_ball = min(player_bbox.keys(), key=lambda x: measure_distance(ball_position, get_center_of_bbox(player_bbox[x])))
-
-            output_player_bboxes_dict = {}
             for player_id, bbox in player_bbox.items():
-                foot_position = get_foot_position(bbox)
-
-                # Get The closest keypoint in pixels
-                closest_key_point_index = get_closest_keypoint_index(foot_position,original_court_key_points, [0,2,12,13])
-                closest_key_point = (original_court_key_points[closest_key_point_index*2], 
-                                     original_court_key_points[closest_key_point_index*2+1])
+                player_points.append((frame_num, player_id, get_foot_position(bbox)))
+        ball_points = [get_center_of_bbox(ball_boxes[frame_num][1]) for frame_num in range(len(player_boxes))]
 
-                # Get Player height in pixels
-                frame_index_min = max(0, frame_num-20)
-                frame_index_max = min(len(player_boxes), frame_num+50)
-                bboxes_heights_in_pixels = [get_height_of_bbox(player_boxes[i][player_id]) for i in range (frame_index_min,frame_index_max) if player_id in player_boxes[i]]
-                max_player_height_in_pixels = max(bboxes_heights_in_pixels) if bboxes_heights_in_pixels else 100  # Default height if no data
+        points = np.array([point for _, _, point in player_points] + ball_points, dtype=np.float32).reshape(-1, 1, 2)
+        if len(points):
+            mini_court_points = cv2.perspectiveTransform(points, homography).reshape(-1, 2).tolist()
+        else:
+            mini_court_points = []
+        mini_court_player_points = mini_court_points[:len(player_points)]
+        mini_court_ball_points = mini_court_points[len(player_points):]
 
-                # Use default height if player_id not in predefined heights
-                player_height_meters = player_heights.get(player_id, constants.PLAYER_1_HEIGHT_METERS)
+        output_player_boxes= [{} for _ in player_boxes]
+        for (frame_num, player_id, _), position in zip(player_points, mini_court_player_points):
+            output_player_boxes[frame_num][player_id] = tuple(position)
 
-                mini_court_player_position = self.get_mini_court_coordinates(foot_position,
-                                                                            closest_key_point, 
-                                                                            closest_key_point_index, 
-                                                                            max_player_height_in_pixels,
-                                                                            player_height_meters
-                                                                            )
-                
-                output_player_bboxes_dict[player_id] = mini_court_player_position
-
-                if closest_player_id_to_ball == player_id:
-                    # Get The closest keypoint in pixels
-                    closest_key_point_index = get_closest_keypoint_index(ball_position,original_court_key_points, [0,2,12,13])
-                    closest_key_point = (original_court_key_points[closest_key_point_index*2], 
-                                        original_court_key_points[closest_key_point_index*2+1])
-                    
-                    mini_court_player_position = self.get_mini_court_coordinates(ball_position,
-                                                                            closest_key_point, 
-                                                                            closest_key_point_index, 
-                                                                            max_player_height_in_pixels,
-                                                                            player_height_meters
-                                                                            )
-                    output_ball_boxes.append({1:mini_court_player_position})
-            output_player_boxes.append(output_player_bboxes_dict)
+        # Frames with no players detected get no ball position either
+        output_ball_boxes= [{1: tuple(position)} if player_bbox else {}
+                            for player_bbox, position in zip(player_boxes, mini_court_ball_points)]
 
         return output_player_boxes , output_ball_boxes
     
+    def draw_points(self, frame, positions, color=(0,255,0)):
+        # Draw the mini court positions of one frame in place
+        for _, position in positions.items():
+            x,y = position
+            x= int(x)
+            y= int(y)
+            cv2.circle(frame, (x,y), 5, color, -1)
+        return frame
+
     def draw_points_on_mini_court(self,frames,postions, color=(0,255,0)):
         for frame_num, frame in enumerate(frames):
-            for _, position in postions[frame_num].items():
-                x,y = position
-                x= int(x)
-                y= int(y)
-                cv2.circle(frame, (x,y), 5, color, -1)
+            self.draw_points(frame, postions[frame_num], color)
         return frames
 
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("ultralytics")
+from trackers import player_tracker
+from trackers.player_tracker import PlayerTracker
+
+
+class FakeModel:
+    # Stands in for YOLO.track, returning the box registered for each frame
+    def __init__(self, boxes_by_frame):
+        self.boxes_by_frame = boxes_by_frame
+        self.tracked_frames = []
+
+    def track(self, frames, **kwargs):
+        for frame in frames:
+            self.tracked_frames.append(id(frame))
+            yield {1: self.boxes_by_frame[id(frame)]}
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    monkeypatch.setattr(player_tracker, "YOLO", lambda model_path: None)
+    monkeypatch.setattr(player_tracker, "use_channels_last", lambda model: model)
+    monkeypatch.setattr(player_tracker, "resolve_model_path", lambda model_path: model_path)
+    tracker = PlayerTracker("yolov8x", batch_size=4)
+    tracker.get_player_dict = lambda result: result
+    return tracker
+
+
+def make_clip(block_positions, x1_values):
+    # A white block moving across a black frame; each frame's true box has the given x1
+    frames, boxes_by_frame = [], {}
+    for block_position, x1 in zip(block_positions, x1_values):
+        frame = np.zeros((100, 100, 3), np.uint8)
+        frame[40:60, block_position:block_position + 10] = 255
+        frames.append(frame)
+        boxes_by_frame[id(frame)] = [x1, 0.0, x1 + 50.0, 100.0]
+    return frames, boxes_by_frame
+
+
+def test_keyframe_stride_with_change_gating(tracker):
+    # The scene moves until frame 4, is static for frames 4-11 and moves again at frame 12
+    block_positions = [0, 10, 20, 30, 40, 40, 40, 40, 40, 40, 40, 40, 80]
+    x1_values = [0.0, 100.0, 200.0, 300.0, 400.0, 400.0, 400.0, 400.0, 400.0, 400.0, 400.0, 400.0, 1200.0]
+    frames, boxes_by_frame = make_clip(block_positions, x1_values)
+    tracker.model = FakeModel(boxes_by_frame)
+
+    tracker.reset_clip_state()
+    player_detections = tracker.detect_frames(frames, change_roi=(0, 0, 100, 100), keyframe_stride=2)
+    player_detections = tracker.interpolate_skipped_frames(player_detections)
+
+    # The stride keeps skipping every other frame after the gated key frames 6, 8 and 10
+    assert tracker.keyframe_skipped_frames == [frame_num % 2 == 1 for frame_num in range(13)]
+    assert np.flatnonzero(tracker.detected_frames).tolist() == [0, 2, 4, 12]
+    # Stride skips between two detections are interpolated, the gated stretch holds the last box
+    assert [player_dict[1][0] for player_dict in player_detections] == x1_values
+
+
+def test_keyframe_stride_without_change_gating(tracker):
+    frames, boxes_by_frame = make_clip(range(0, 70, 10), [0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0])
+    tracker.model = FakeModel(boxes_by_frame)
+
+    tracker.reset_clip_state()
+    player_detections = tracker.detect_frames(frames, keyframe_stride=3)
+    player_detections = tracker.interpolate_skipped_frames(player_detections)
+
+    assert np.flatnonzero(tracker.detected_frames).tolist() == [0, 3, 6]
+    assert [player_dict[1][0] for player_dict in player_detections] == pytest.approx([0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0])
+
+
+class FakeTensor:
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+def make_untracked_results():
+    # One confident, player-sized person box without a ByteTrack id
+    boxes = SimpleNamespace(xyxy=FakeTensor([[900.0, 500.0, 1000.0, 700.0]]), cls=FakeTensor([0.0]),
+                            conf=FakeTensor([0.9]), id=None)
+    return SimpleNamespace(names={0: "person"}, boxes=boxes)
+
+
+def test_fallback_ids_restart_per_clip(tracker):
+    del tracker.get_player_dict
+    assert list(tracker.get_player_dict(make_untracked_results())) == [10**6]
+    assert list(tracker.get_player_dict(make_untracked_results())) == [10**6 + 1]
+
+    tracker.reset_clip_state()
+    assert list(tracker.get_player_dict(make_untracked_results())) == [10**6]
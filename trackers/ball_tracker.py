@@ -1,16 +1,42 @@
 from ultralytics import YOLO 
 import cv2
-import pickle
+import numpy as np
 import pandas as pd
+import sys
+sys.path.append('../')
+from utils import resolve_model_path, use_channels_last, use_half_precision, create_cuda_stream, cuda_stream_context, read_stub, save_stub, batch_frames
+
+# Drawing settings shared by every frame
+BBOX_FONT = cv2.FONT_HERSHEY_SIMPLEX
+BALL_BBOX_COLOR = (0, 255, 255)
 
 class BallTracker:
-    def __init__(self,model_path):
-        self.model = YOLO(model_path)
+    def __init__(self,model_path, imgsz=416, batch_size=16, conf=0.15, use_cuda_stream=False):
+        # Use the exported TensorRT engine when one sits next to the weights
+        self.model_path = resolve_model_path(model_path)
+        self.model = use_channels_last(YOLO(self.model_path))
+        # The ball is small but roughly centred, it survives the smaller letterbox well.
+        # ultralytics scales the boxes back to the original frame size
+        self.imgsz = imgsz
+        # Frames per predict() call, tune to available VRAM
+        self.batch_size = batch_size
+        # FP16 inference on CUDA
+        self.half = use_half_precision()
+        # Minimum confidence of a ball detection
+        self.conf = conf
+        # Optional stream of its own so this model overlaps with the player model
+        self.cuda_stream = create_cuda_stream() if use_cuda_stream else None
+
+    def get_ball_position_array(self, ball_positions):
+        # (frames, 4) float array of the ball boxes, NaN where the ball was not detected
+        ball_position_array = np.full((len(ball_positions), 4), np.nan)
+        for frame_num, ball_dict in enumerate(ball_positions):
+            if 1 in ball_dict:
+                ball_position_array[frame_num] = ball_dict[1]
+        return ball_position_array
 
     def interpolate_ball_positions(self, ball_positions):
-        ball_positions = [x.get(1,[]) for x in ball_positions]
-        # convert the list into pandas dataframe
-        df_ball_positions = pd.DataFrame(ball_positions,columns=['x1','y1','x2','y2'])
+        df_ball_positions = pd.DataFrame(self.get_ball_position_array(ball_positions),columns=['x1','y1','x2','y2'])
 
         # interpolate the missing values
         df_ball_positions = df_ball_positions.interpolate()
@@ -21,9 +47,7 @@ class BallTracker:
         return ball_positions
 
     def get_ball_shot_frames(self,ball_positions):
-        ball_positions = [x.get(1,[]) for x in ball_positions]
-        # convert the list into pandas dataframe
-        df_ball_positions = pd.DataFrame(ball_positions,columns=['x1','y1','x2','y2'])
+        df_ball_positions = pd.DataFrame(self.get_ball_position_array(ball_positions),columns=['x1','y1','x2','y2'])
 
         df_ball_positions['ball_hit'] = 0
 
@@ -53,27 +77,33 @@ class BallTracker:
 
         return frame_nums_with_ball_hits
 
-    def detect_frames(self,frames, read_from_stub=False, stub_path=None):
+    def detect_frames(self,frames, read_from_stub=False, stub_path=None, batch_size=None):
         ball_detections = []
 
         if read_from_stub and stub_path is not None:
-            with open(stub_path, 'rb') as f:
-                ball_detections = pickle.load(f)
-            return ball_detections
-
-        for frame in frames:
-            player_dict = self.detect_frame(frame)
-            ball_detections.append(player_dict)
+            return read_stub(stub_path)
+
+        batch_size = batch_size or self.batch_size
+
+        # Run the model on batches of frames to amortize per-call overhead;
+        # frames may be a generator, prefetching it is left to the caller
+        for batch in batch_frames(frames, batch_size):
+            with cuda_stream_context(self.cuda_stream):
+                # stream=True hands over one Results at a time, each is parsed and freed right away
+                results = self.model.predict(batch, conf=self.conf, imgsz=self.imgsz, stream=True, half=self.half, verbose=False)
+                for result in results:
+                    ball_detections.append(self.get_ball_dict(result))
         
         if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(ball_detections, f)
+            save_stub(ball_detections, stub_path)
         
         return ball_detections
 
     def detect_frame(self,frame):
-        results = self.model.predict(frame,conf=0.15)[0]
+        results = self.model.predict(frame,conf=self.conf, imgsz=self.imgsz, half=self.half, verbose=False)[0]
+        return self.get_ball_dict(results)
 
+    def get_ball_dict(self, results):
         ball_dict = {}
         for box in results.boxes:
             result = box.xyxy.tolist()[0]
@@ -81,17 +111,20 @@ class BallTracker:
         
         return ball_dict
 
+    def draw_bbox(self, frame, ball_dict):
+        # Draw the bounding box of one frame in place
+        for track_id, bbox in ball_dict.items():
+            x1, y1, x2, y2 = bbox
+            top_left = (int(x1), int(y1))
+            cv2.putText(frame, f"Ball ID: {track_id}", (top_left[0], int(y1 - 10)), BBOX_FONT, 0.9, BALL_BBOX_COLOR, 2)
+            cv2.rectangle(frame, top_left, (int(x2), int(y2)), BALL_BBOX_COLOR, 2)
+        return frame
+
     def draw_bboxes(self,video_frames, player_detections):
-        output_video_frames = []
+        # Frames are drawn in place and yielded one at a time, so a stream of
+        # frames can go straight to save_video without an output list
         for frame, ball_dict in zip(video_frames, player_detections):
-            # Draw Bounding Boxes
-            for track_id, bbox in ball_dict.items():
-                x1, y1, x2, y2 = bbox
-                cv2.putText(frame, f"Ball ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 2)
-            output_video_frames.append(frame)
-        
-        return output_video_frames
+            yield self.draw_bbox(frame, ball_dict)
 
 
     
\ No newline at end of file
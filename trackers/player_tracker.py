@@ -1,64 +1,122 @@
 from ultralytics import YOLO 
 import cv2
-import pickle
+import heapq
+import itertools
+import numpy as np
 import sys
 sys.path.append('../')
-from utils import measure_distance, get_center_of_bbox, get_foot_position
+from utils import get_center_of_bbox, score_player_candidates, resolve_model_path, use_channels_last, use_half_precision, create_cuda_stream, cuda_stream_context, read_stub, save_stub, frame_changed, batch_frames
+
+# Drawing settings shared by every frame
+BBOX_FONT = cv2.FONT_HERSHEY_SIMPLEX
+PLAYER_BBOX_COLOR = (0, 0, 255)
+
+# Frame size the court heuristics assume, and the court area derived from it
+FRAME_WIDTH, FRAME_HEIGHT = 1920, 1080
+COURT_LEFT, COURT_RIGHT = FRAME_WIDTH * 0.2, FRAME_WIDTH * 0.8  # Central 60%
+COURT_TOP = FRAME_HEIGHT * 0.2  # Lower 80%
+
+# Balanced filtering for tennis players - less aggressive to catch more players:
+# 1. Lower confidence threshold to catch partially occluded players
+# 2. Wider size range to accommodate different distances
+# 3. Better aspect ratio range
+# 4. Less strict position filtering
+MIN_CONFIDENCE = 0.5  # Reduced from 0.7 to catch more players
+MIN_AREA = 5000  # Reduced from 8000 to catch smaller/distant players
+MAX_AREA = 150000  # Increased from 120000 for closer players
+MIN_HEIGHT = 60  # Reduced from 80
+MAX_WIDTH = 250  # Increased from 200
 
 class PlayerTracker:
-    def __init__(self,model_path):
-        self.model = YOLO(model_path)
+    def __init__(self,model_path, imgsz=640, batch_size=16, conf=MIN_CONFIDENCE, debug=False, use_cuda_stream=False):
+        # Use the exported TensorRT engine when one sits next to the weights
+        self.model_path = resolve_model_path(model_path)
+        self.model = use_channels_last(YOLO(self.model_path))
+        # Inference image size; ultralytics letterboxes the frames on the CPU
+        # before the upload and scales the boxes back to the original frame size
+        self.imgsz = imgsz
+        # Frames per track() call, tune to available VRAM
+        self.batch_size = batch_size
+        # FP16 inference on CUDA
+        self.half = use_half_precision()
+        # Minimum confidence of a player box; ByteTrack still sees the weaker
+        # boxes, they are only dropped from the player dicts
+        self.conf = conf
+        # Optional stream of its own so this model overlaps with the ball model
+        self.cuda_stream = create_cuda_stream() if use_cuda_stream else None
+        # Print per-frame tracking details (ID re-mapping) when set
+        self.debug = debug
+        # Class id of "person", resolved from the first results (reading
+        # model.names here would set up the predictor with default arguments)
+        self.person_cls = None
+        self.reset_clip_state()
+
+    def reset_clip_state(self):
+        # Call before the first detect_frames call of a new clip
+        # Last frame that went through the model and its detections, reused
+        # for following frames in which nothing moved on court
+        self.last_detected_frame = None
+        self.last_player_dict = {}
+        # Frames since the last model run (for redetect_every) and since the
+        # last key frame (for keyframe_stride), counted separately so change
+        # gating on a key frame does not stop the stride
+        self.frames_since_detection = 0
+        self.frames_since_keyframe = 0
+        # Per frame of the clip: whether it went through the model, and whether
+        # it was skipped for lying between key frames
+        self.detected_frames = []
+        self.keyframe_skipped_frames = []
+        # Fallback IDs for boxes ByteTrack did not assign one to, far above the
+        # track ids ByteTrack hands out in a clip
+        self.fallback_ids = itertools.count(10**6)
 
-    def choose_and_filter_players(self, court_keypoints, player_detections):
+    def score_initial_frame(self, court_keypoints, player_dict):
+        # Court-based score and center of every player choose_players picks in one frame
+        frame_scores = {}
+        for player_id in self.choose_players(court_keypoints, player_dict):
+            bbox = player_dict[player_id]
+            x1, y1, x2, y2 = bbox
+            player_center = get_center_of_bbox(bbox)
+            center_x, center_y = player_center
+            
+            score = 0
+            if COURT_LEFT < center_x < COURT_RIGHT:
+                score += 3
+            if center_y > COURT_TOP:
+                score += 2
+            if (x2-x1) * (y2-y1) > 15000:
+                score += 2
+            frame_scores[player_id] = (score, player_center)
+        return frame_scores
+
+    def choose_initial_players(self, court_keypoints, player_detections):
         # Step 1: Find the best initial players from first few frames
-        print("=== DYNAMIC PLAYER TRACKING ===")
-        
         # Collect player statistics across first 10 frames for initial selection
         player_stats = {}
         
-        for frame_idx, player_dict in enumerate(player_detections[:10]):
-            frame_candidates = self.choose_players(court_keypoints, player_dict)
-            
-            for player_id in frame_candidates:
+        initial_frames = player_detections[:10]
+        for frame_idx, player_dict in enumerate(initial_frames):
+            for player_id, (score, player_center) in self.score_initial_frame(court_keypoints, player_dict).items():
                 if player_id not in player_stats:
                     player_stats[player_id] = {
                         'appearances': 0,
                         'total_score': 0,
-                        'positions': [],
+                        # One row per initial frame, NaN where the player wasn't chosen
+                        'positions': np.full((len(initial_frames), 2), np.nan),
                         'first_appearance': frame_idx
                     }
                 
-                player_stats[player_id]['appearances'] += 1
-                
-                if player_id in player_dict:
-                    bbox = player_dict[player_id]
-                    x1, y1, x2, y2 = bbox
-                    player_center = get_center_of_bbox(bbox)
-                    
-                    # Court-based scoring
-                    frame_width, frame_height = 1920, 1080
-                    center_x, center_y = player_center
-                    
-                    score = 0
-                    if frame_width * 0.2 < center_x < frame_width * 0.8:
-                        score += 3
-                    if center_y > frame_height * 0.2:
-                        score += 2
-                    if (x2-x1) * (y2-y1) > 15000:
-                        score += 2
-                    
-                    player_stats[player_id]['total_score'] += score
-                    player_stats[player_id]['positions'].append(player_center)
+                stats = player_stats[player_id]
+                stats['appearances'] += 1
+                stats['total_score'] += score
+                stats['positions'][frame_idx] = player_center
         
         # Calculate movement variance (tennis players move, spectators are static)
         for player_id, stats in player_stats.items():
-            if len(stats['positions']) > 1:
-                positions = stats['positions']
-                x_positions = [pos[0] for pos in positions]
-                y_positions = [pos[1] for pos in positions]
-                
-                x_variance = sum((x - sum(x_positions)/len(x_positions))**2 for x in x_positions) / len(x_positions)
-                y_variance = sum((y - sum(y_positions)/len(y_positions))**2 for y in y_positions) / len(y_positions)
+            positions = stats['positions']
+            positions = positions[~np.isnan(positions[:, 0])]
+            if len(positions) > 1:
+                x_variance, y_variance = np.var(positions, axis=0)
                 
                 movement_bonus = min(5, (x_variance + y_variance) / 1000)
                 stats['total_score'] += movement_bonus
@@ -70,13 +128,23 @@ class PlayerTracker:
             final_score = avg_score * (stats['appearances'] / 10)
             player_rankings.append((player_id, final_score, stats['appearances']))
         
-        player_rankings.sort(key=lambda x: -x[1])
-        initial_chosen_players = [player_rankings[i][0] for i in range(min(2, len(player_rankings)))]
+        # Only the top 5 are ever looked at, no need to sort all of them
+        top_rankings = heapq.nsmallest(5, player_rankings, key=lambda x: -x[1])
+        initial_chosen_players = [player_id for player_id, _, _ in top_rankings[:2]]
         
         print(f"Initial player selection:")
-        for player_id, score, appearances in player_rankings[:5]:
+        for player_id, score, appearances in top_rankings:
             print(f"  Player {player_id}: score={score:.2f}, appearances={appearances}/10")
         print(f"  Initial chosen players: {initial_chosen_players}")
+        return initial_chosen_players
+
+    def choose_and_filter_players(self, court_keypoints, player_detections, initial_chosen_players=None):
+        print("=== DYNAMIC PLAYER TRACKING ===")
+        # The initial choice only depends on the detections, so callers can pass a cached one
+        if initial_chosen_players is None:
+            initial_chosen_players = self.choose_initial_players(court_keypoints, player_detections)
+        else:
+            print(f"  Using cached initial players: {initial_chosen_players}")
         
         # Step 2: Dynamic tracking with ID re-mapping
         # Track last known positions of our chosen players
@@ -106,46 +174,53 @@ class PlayerTracker:
                 player_2_last_pos = get_center_of_bbox(player_dict[player_2_id])
             
             # If we're missing players, try to find them by position similarity
+            # (a player that was never seen has no position to match against)
             missing_players = []
-            if player_1_id and player_1_id not in player_dict:
+            if player_1_id and player_1_id not in player_dict and player_1_last_pos is not None:
                 missing_players.append(('player_1', player_1_last_pos))
-            if player_2_id and player_2_id not in player_dict:
+            if player_2_id and player_2_id not in player_dict and player_2_last_pos is not None:
                 missing_players.append(('player_2', player_2_last_pos))
             
-            # Find unaccounted players in current frame
-            unaccounted_players = {pid: bbox for pid, bbox in player_dict.items() 
-                                 if pid not in current_frame_players}
+            # Frames with both players found by ID (the common case) only look at those two IDs
+            if not missing_players:
+                filtered_player_detections.append(current_frame_players)
+                continue
+            
+            # Find unaccounted players in current frame, each center computed once
+            centers = {pid: get_center_of_bbox(bbox) for pid, bbox in player_dict.items()
+                       if pid not in current_frame_players}
+            unaccounted_ids = list(centers)
+            unaccounted_centers = np.array(list(centers.values()), dtype=np.float64).reshape(-1, 2)
             
             # Match missing players to unaccounted players by proximity
             for missing_player, last_pos in missing_players:
-                if last_pos is None or not unaccounted_players:
+                if not unaccounted_ids:
                     continue
                 
-                best_match_id = None
-                best_distance = float('inf')
+                # Distances to every unaccounted player at once; argmin keeps the first closest one
+                distances = np.sqrt((unaccounted_centers[:, 0] - last_pos[0])**2 + (unaccounted_centers[:, 1] - last_pos[1])**2)
+                best_index = int(np.argmin(distances))
+                best_distance = distances[best_index]
                 
-                for pid, bbox in unaccounted_players.items():
-                    current_pos = get_center_of_bbox(bbox)
-                    distance = measure_distance(last_pos, current_pos)
-                    
-                    # Only consider matches within reasonable distance (players don't teleport)
-                    if distance < 300 and distance < best_distance:  # 300 pixels max movement
-                        best_distance = distance
-                        best_match_id = pid
+                # Only consider matches within reasonable distance (players don't teleport)
+                best_match_id = unaccounted_ids[best_index] if best_distance < 300 else None  # 300 pixels max movement
                 
                 # Re-map the player ID
                 if best_match_id:
                     if missing_player == 'player_1':
-                        current_frame_players[player_1_id] = unaccounted_players[best_match_id]
-                        player_1_last_pos = get_center_of_bbox(unaccounted_players[best_match_id])
-                        print(f"  Frame {frame_idx}: Re-mapped Player {best_match_id} -> Player {player_1_id} (distance: {best_distance:.1f})")
+                        current_frame_players[player_1_id] = player_dict[best_match_id]
+                        player_1_last_pos = centers[best_match_id]
+                        if self.debug:
+                            print(f"  Frame {frame_idx}: Re-mapped Player {best_match_id} -> Player {player_1_id} (distance: {best_distance:.1f})")
                     else:  # player_2
-                        current_frame_players[player_2_id] = unaccounted_players[best_match_id]
-                        player_2_last_pos = get_center_of_bbox(unaccounted_players[best_match_id])
-                        print(f"  Frame {frame_idx}: Re-mapped Player {best_match_id} -> Player {player_2_id} (distance: {best_distance:.1f})")
+                        current_frame_players[player_2_id] = player_dict[best_match_id]
+                        player_2_last_pos = centers[best_match_id]
+                        if self.debug:
+                            print(f"  Frame {frame_idx}: Re-mapped Player {best_match_id} -> Player {player_2_id} (distance: {best_distance:.1f})")
                     
                     # Remove from unaccounted
-                    del unaccounted_players[best_match_id]
+                    del unaccounted_ids[best_index]
+                    unaccounted_centers = np.delete(unaccounted_centers, best_index, axis=0)
             
             filtered_player_detections.append(current_frame_players)
         
@@ -166,141 +241,167 @@ class PlayerTracker:
         # 2. Have reasonable size (actual players, not distant people)
         # 3. Are positioned like tennis players (center court area)
         
-        candidates = []
-        for track_id, bbox in player_dict.items():
-            x1, y1, x2, y2 = bbox
-            player_center = get_center_of_bbox(bbox)
-            player_foot = get_foot_position(bbox)
-            
-            bbox_width = x2 - x1
-            bbox_height = y2 - y1
-            bbox_area = bbox_width * bbox_height
-            
-            # Tennis court area analysis (assuming 1920x1080 frame)
-            frame_width, frame_height = 1920, 1080
-            
-            # Tennis players should be:
-            # - In central 60% of frame width (not on extreme edges)
-            # - In lower 80% of frame height (on court, not in stands)
-            # - Have substantial size (not tiny distant spectators)
-            # - Not be static edge detections
-            
-            center_x, center_y = player_center
-            
-            # Court area constraints
-            is_in_court_width = (frame_width * 0.2 < center_x < frame_width * 0.8)  # Central 60%
-            is_in_court_height = (center_y > frame_height * 0.2)  # Lower 80%
-            is_substantial_size = (bbox_area > 15000)  # Larger than small spectators
-            is_not_edge = (x1 > 50 and x2 < frame_width - 50)  # Not touching frame edges
-            is_reasonable_aspect = (1.0 < bbox_height/bbox_width < 4.0)  # Human proportions
-            
-            # Calculate distance to court center (approximate tennis court center)
-            court_center_x, court_center_y = frame_width * 0.5, frame_height * 0.6
-            distance_to_court_center = measure_distance(player_center, (court_center_x, court_center_y))
-            
-            # Score each candidate
-            score = 0
-            if is_in_court_width: score += 3
-            if is_in_court_height: score += 2  
-            if is_substantial_size: score += 2
-            if is_not_edge: score += 1
-            if is_reasonable_aspect: score += 1
-            
-            # Bonus for being closer to court center
-            score += max(0, 3 - distance_to_court_center / 200)
-            
-            candidates.append((track_id, bbox, score, distance_to_court_center))
+        # Score all candidates in one kernel over an (N, 4) bbox array
+        # (assuming a FRAME_WIDTH x FRAME_HEIGHT frame); see score_player_candidates
+        track_ids = list(player_dict.keys())
+        bboxes = np.array([player_dict[track_id] for track_id in track_ids], dtype=np.float64)
+        scores, distances_to_court_center = score_player_candidates(bboxes, float(FRAME_WIDTH), float(FRAME_HEIGHT))
         
         # Sort by score (descending) then by distance to court center (ascending)
-        candidates.sort(key=lambda x: (-x[2], x[3]))
+        order = np.lexsort((distances_to_court_center, -scores))
         
         # Take top 2 candidates
-        chosen_players = [candidates[i][0] for i in range(min(2, len(candidates)))]
+        chosen_players = [track_ids[i] for i in order[:2]]
         
         return chosen_players
 
-    def detect_frames(self,frames, read_from_stub=False, stub_path=None):
+    def is_between_keyframes(self, keyframe_stride):
+        # Every keyframe_stride-th frame is a key frame; the frames in between
+        # skip the model and are interpolated by interpolate_skipped_frames
+        if self.last_detected_frame is not None and self.frames_since_keyframe < keyframe_stride - 1:
+            self.frames_since_keyframe += 1
+            return True
+        self.frames_since_keyframe = 0
+        return False
+
+    def needs_detection(self, frame, change_roi, redetect_every):
+        # Without a region to watch every key frame is detected; otherwise only key
+        # frames where something moved on court, and at least every redetect_every-th
+        # frame (rounded up to the next key frame)
+        if (change_roi is None or self.last_detected_frame is None
+                or self.frames_since_detection >= redetect_every - 1
+                or frame_changed(self.last_detected_frame, frame, change_roi)):
+            self.last_detected_frame = frame
+            self.frames_since_detection = 0
+            return True
+        self.frames_since_detection += 1
+        return False
+
+    def detect_frames(self,frames, read_from_stub=False, stub_path=None, batch_size=None, change_roi=None, redetect_every=8, keyframe_stride=1):
         player_detections = []
 
         if read_from_stub and stub_path is not None:
-            with open(stub_path, 'rb') as f:
-                player_detections = pickle.load(f)
-            return player_detections
+            return read_stub(stub_path)
+
+        batch_size = batch_size or self.batch_size
 
-        for frame in frames:
-            player_dict = self.detect_frame(frame)
-            player_detections.append(player_dict)
+        # Track batches of frames per call; the tracker still consumes the
+        # frames of a batch in order, so IDs persist across batches. frames
+        # may be a generator; prefetching it is left to the caller
+        for batch in batch_frames(frames, batch_size):
+            detect_mask = []
+            for frame in batch:
+                keyframe_skip = self.is_between_keyframes(keyframe_stride)
+                if keyframe_skip:
+                    self.frames_since_detection += 1
+                detect_mask.append(not keyframe_skip and self.needs_detection(frame, change_roi, redetect_every))
+                self.keyframe_skipped_frames.append(keyframe_skip)
+            self.detected_frames.extend(detect_mask)
+            frames_to_detect = [frame for frame, detect in zip(batch, detect_mask) if detect]
+            with cuda_stream_context(self.cuda_stream):
+                # stream=True hands over one Results at a time, each is parsed and freed right away
+                results = self.model.track(frames_to_detect, persist=True, tracker="bytetrack.yaml", stream=True,
+                                           imgsz=self.imgsz, half=self.half, verbose=False) if frames_to_detect else []
+                detected_player_dicts = iter([self.get_player_dict(result) for result in results])
+                for detect in detect_mask:
+                    if detect:
+                        self.last_player_dict = next(detected_player_dicts)
+                    player_detections.append(dict(self.last_player_dict))
         
         if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(player_detections, f)
+            save_stub(player_detections, stub_path)
         
         return player_detections
 
+    def interpolate_skipped_frames(self, player_detections):
+        # Frames skipped by the key frame stride hold a copy of the last detected
+        # frame; players that are also in the next detected frame are moved
+        # linearly between the two instead. When a key frame in between was
+        # skipped because nothing moved on court, the whole stretch keeps the
+        # last boxes, as the next detection may be far off. player_detections
+        # are all frames of the clip seen by detect_frames since
+        # reset_clip_state, in order
+        if len(player_detections) != len(self.detected_frames):
+            raise ValueError(f"Got {len(player_detections)} frames of detections, but detect_frames saw "
+                             f"{len(self.detected_frames)} frames since reset_clip_state")
+        detected_frame_nums = np.flatnonzero(self.detected_frames)
+        for start, end in zip(detected_frame_nums[:-1], detected_frame_nums[1:]):
+            if end - start < 2 or not all(self.keyframe_skipped_frames[start + 1:end]):
+                continue
+            keyframe_skipped = np.arange(start + 1, end)
+            start_dict, end_dict = player_detections[start], player_detections[end]
+            weights = ((keyframe_skipped - start) / (end - start))[:, None]
+            for track_id in start_dict.keys() & end_dict.keys():
+                start_bbox = np.asarray(start_dict[track_id])
+                bboxes = start_bbox + weights * (np.asarray(end_dict[track_id]) - start_bbox)
+                for frame_num, bbox in zip(keyframe_skipped.tolist(), bboxes.tolist()):
+                    player_detections[frame_num][track_id] = bbox
+        return player_detections
+
     def detect_frame(self,frame):
         # Use more persistent tracking parameters
-        results = self.model.track(frame, persist=True, tracker="bytetrack.yaml")[0]
-        id_name_dict = results.names
+        results = self.model.track(frame, persist=True, tracker="bytetrack.yaml", imgsz=self.imgsz, half=self.half, verbose=False)[0]
+        return self.get_player_dict(results)
+
+    def get_player_dict(self, results):
+        if self.person_cls is None:
+            self.person_cls = next(cls_id for cls_id, name in results.names.items() if name == "person")
+
+        # Move every box attribute to the CPU once per frame instead of once per box.
+        # float64 keeps the threshold checks identical to the per-box Python arithmetic
+        boxes = results.boxes
+        xyxy = boxes.xyxy.cpu().numpy().astype(np.float64)
+        cls = boxes.cls.cpu().numpy().astype(int)
+        conf = boxes.conf.cpu().numpy()
+        ids = boxes.id.cpu().numpy().astype(int) if boxes.id is not None else None
+
+        # Evaluate the filter for all boxes of the frame at once
+        x1, y1, x2, y2 = xyxy.T
+        bbox_width = x2 - x1
+        bbox_height = y2 - y1
+        bbox_area = bbox_width * bbox_height
+        aspect_ratio = np.divide(bbox_height, bbox_width, out=np.zeros_like(bbox_height), where=bbox_width > 0)
+        center_y = (y1 + y2) / 2
+        is_person = cls == self.person_cls
+
+        is_player = (is_person &
+                     (conf >= self.conf) &
+                     (MIN_AREA <= bbox_area) & (bbox_area <= MAX_AREA) &
+                     (bbox_height >= MIN_HEIGHT) &
+                     (bbox_width <= MAX_WIDTH) &
+                     (aspect_ratio >= 1.0) &  # Reduced from 1.2 to catch more orientations
+                     (aspect_ratio <= 5.0) &  # Increased from 4.0
+                     (center_y >= COURT_TOP))  # Allow top 20% (was 30%) for players near net
 
         player_dict = {}
-        for box in results.boxes:
+        for i in np.flatnonzero(is_player):
+            result = xyxy[i].tolist()
+
             # Check if tracking ID is available
-            if box.id is not None:
-                track_id = int(box.id.tolist()[0])
+            if ids is not None:
+                track_id = int(ids[i])
             else:
                 # Use a fallback ID if tracking fails
-                track_id = hash(tuple(box.xyxy.tolist()[0])) % 10000  # Generate pseudo-ID from bbox coordinates
-                
-            result = box.xyxy.tolist()[0]
-            object_cls_id = box.cls.tolist()[0]
-            object_cls_name = id_name_dict[object_cls_id]
-            confidence = box.conf.tolist()[0]
-            
-            # Balanced filtering for tennis players - less aggressive to catch more players
-            if object_cls_name == "person":
-                x1, y1, x2, y2 = result
-                bbox_width = x2 - x1
-                bbox_height = y2 - y1
-                bbox_area = bbox_width * bbox_height
-                
-                # More balanced filtering to catch both players:
-                # 1. Lower confidence threshold to catch partially occluded players
-                # 2. Wider size range to accommodate different distances
-                # 3. Better aspect ratio range
-                # 4. Less strict position filtering
-                min_confidence = 0.5  # Reduced from 0.7 to catch more players
-                min_area = 5000  # Reduced from 8000 to catch smaller/distant players
-                max_area = 150000  # Increased from 120000 for closer players
-                min_height = 60  # Reduced from 80
-                max_width = 250  # Increased from 200
-                aspect_ratio = bbox_height / bbox_width if bbox_width > 0 else 0
-                
-                # Less strict position filtering - allow players in more areas
-                frame_height = 1080
-                center_y = (y1 + y2) / 2
-                
-                if (confidence >= min_confidence and 
-                    min_area <= bbox_area <= max_area and 
-                    bbox_height >= min_height and
-                    bbox_width <= max_width and
-                    aspect_ratio >= 1.0 and  # Reduced from 1.2 to catch more orientations
-                    aspect_ratio <= 5.0 and  # Increased from 4.0
-                    center_y >= frame_height * 0.2):  # Allow top 20% (was 30%) for players near net
-                    player_dict[track_id] = result
+                track_id = next(self.fallback_ids)
+
+            player_dict[track_id] = result
         
         return player_dict
 
+    def draw_bbox(self, frame, player_dict):
+        # Draw the bounding boxes of one frame in place
+        for track_id, bbox in player_dict.items():
+            x1, y1, x2, y2 = bbox
+            top_left = (int(x1), int(y1))
+            cv2.putText(frame, f"Player ID: {track_id}", (top_left[0], int(y1 - 10)), BBOX_FONT, 0.9, PLAYER_BBOX_COLOR, 2)
+            cv2.rectangle(frame, top_left, (int(x2), int(y2)), PLAYER_BBOX_COLOR, 2)
+        return frame
+
     def draw_bboxes(self,video_frames, player_detections):
-        output_video_frames = []
+        # Frames are drawn in place and yielded one at a time, so a stream of
+        # frames can go straight to save_video without an output list
         for frame, player_dict in zip(video_frames, player_detections):
-            # Draw Bounding Boxes
-            for track_id, bbox in player_dict.items():
-                x1, y1, x2, y2 = bbox
-                cv2.putText(frame, f"Player ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 2)
-            output_video_frames.append(frame)
-        
-        return output_video_frames
+            yield self.draw_bbox(frame, player_dict)
 
 
     
\ No newline at end of file
@@ -1,4 +1,9 @@
-from .video_utils import read_video, save_video, read_video_limited, read_video_sampled, get_video_info
+from .video_utils import read_video, save_video, read_video_limited, read_video_sampled, iter_video_sampled, iter_video_sampled_av, batch_frames, prefetch, BackgroundVideoWriter, FFmpegVideoWriter, open_video_writer, get_video_info
 from .bbox_utils import get_center_of_bbox, measure_distance, get_foot_position,get_closest_keypoint_index,get_height_of_bbox,measure_xy_distance,get_center_of_bbox
 from .conversions import convert_pixel_distance_to_meters, convert_meters_to_pixel_distance
-from .player_stats_drawer_utils import draw_player_stats
\ No newline at end of file
+from .player_stats_drawer_utils import draw_player_stats, draw_player_stats_frame
+from .fast_geom import measure_distances, pixel_distances_to_meters, score_player_candidates
+from .player_stats_utils import get_player_stats_data, expand_player_stats_to_frames
+from .model_utils import get_exported_model_path, resolve_model_path, use_channels_last, use_half_precision, create_cuda_stream, cuda_stream_context, export_engine_if_missing
+from .stub_utils import read_stub, save_stub, get_stub_key, get_file_fingerprint, save_detections_npz, read_detections_npz
+from .frame_change_utils import get_court_roi, frame_changed
@@ -0,0 +1,82 @@
+import math
+import numpy as np
+
+# numba is optional: without it the same functions run as NumPy code.
+# fastmath is left off because missing positions are encoded as NaN
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def measure_distances(points_a, points_b):
+        distances = np.empty(points_a.shape[0])
+        for i in range(points_a.shape[0]):
+            distances[i] = math.sqrt((points_a[i, 0] - points_b[i, 0])**2 + (points_a[i, 1] - points_b[i, 1])**2)
+        return distances
+
+    @njit(cache=True)
+    def pixel_distances_to_meters(pixel_distances, refrence_height_in_meters, refrence_height_in_pixels):
+        return pixel_distances * (refrence_height_in_meters / refrence_height_in_pixels)
+
+    @njit(cache=True)
+    def score_player_candidates(bboxes, frame_width, frame_height):
+        # Tennis players should be in the central 60% of the frame width, in
+        # the lower 80% of its height, of substantial size, away from the
+        # frame edges, with human proportions and close to the court center
+        scores = np.empty(bboxes.shape[0])
+        distances_to_court_center = np.empty(bboxes.shape[0])
+        court_center_x, court_center_y = frame_width * 0.5, frame_height * 0.6
+        for i in range(bboxes.shape[0]):
+            x1, y1, x2, y2 = bboxes[i, 0], bboxes[i, 1], bboxes[i, 2], bboxes[i, 3]
+            # Integer center, like get_center_of_bbox
+            center_x = float(int((x1 + x2) / 2))
+            center_y = float(int((y1 + y2) / 2))
+            bbox_width = x2 - x1
+            bbox_height = y2 - y1
+
+            score = 0.0
+            if frame_width * 0.2 < center_x < frame_width * 0.8:
+                score += 3
+            if center_y > frame_height * 0.2:
+                score += 2
+            if bbox_width * bbox_height > 15000:
+                score += 2
+            if x1 > 50 and x2 < frame_width - 50:
+                score += 1
+            if bbox_width > 0 and 1.0 < bbox_height / bbox_width < 4.0:
+                score += 1
+
+            distance = math.sqrt((center_x - court_center_x)**2 + (center_y - court_center_y)**2)
+            scores[i] = score + max(0.0, 3 - distance / 200)
+            distances_to_court_center[i] = distance
+        return scores, distances_to_court_center
+
+    # Compile on import so the first real call doesn't pay for it
+    measure_distances(np.zeros((1, 2)), np.zeros((1, 2)))
+    pixel_distances_to_meters(np.zeros(1), 1.0, 1.0)
+    score_player_candidates(np.zeros((1, 4)), 1920.0, 1080.0)
+else:
+    def measure_distances(points_a, points_b):
+        return np.hypot(points_a[:, 0] - points_b[:, 0], points_a[:, 1] - points_b[:, 1])
+
+    def pixel_distances_to_meters(pixel_distances, refrence_height_in_meters, refrence_height_in_pixels):
+        return pixel_distances * (refrence_height_in_meters / refrence_height_in_pixels)
+
+    def score_player_candidates(bboxes, frame_width, frame_height):
+        x1, y1, x2, y2 = bboxes.T
+        center_x = np.trunc((x1 + x2) / 2)
+        center_y = np.trunc((y1 + y2) / 2)
+        bbox_width = x2 - x1
+        bbox_height = y2 - y1
+        aspect_ratio = np.divide(bbox_height, bbox_width, out=np.zeros_like(bbox_height), where=bbox_width > 0)
+
+        scores = (3.0 * ((frame_width * 0.2 < center_x) & (center_x < frame_width * 0.8)) +
+                  2.0 * (center_y > frame_height * 0.2) +
+                  2.0 * (bbox_width * bbox_height > 15000) +
+                  1.0 * ((x1 > 50) & (x2 < frame_width - 50)) +
+                  1.0 * ((1.0 < aspect_ratio) & (aspect_ratio < 4.0)))
+        distances_to_court_center = np.sqrt((center_x - frame_width * 0.5)**2 + (center_y - frame_height * 0.6)**2)
+        return scores + np.maximum(0.0, 3 - distances_to_court_center / 200), distances_to_court_center
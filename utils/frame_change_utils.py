@@ -0,0 +1,47 @@
+import cv2
+import numpy as np
+
+def get_court_roi(court_keypoints, frame_shape, margin=150):
+    """
+    Bounding box of the court keypoints, padded so players standing behind
+    the baselines or beside the tramlines are inside it
+
+    Args:
+        court_keypoints: Flat list of x, y court keypoints
+        frame_shape: Shape of the video frames
+        margin: Padding in pixels around the keypoints
+
+    Returns:
+        (x1, y1, x2, y2) clipped to the frame
+    """
+    keypoints = np.asarray(court_keypoints, dtype=np.float64).reshape(-1, 2)
+    frame_height, frame_width = frame_shape[:2]
+    x1 = max(int(keypoints[:, 0].min()) - margin, 0)
+    y1 = max(int(keypoints[:, 1].min()) - margin, 0)
+    x2 = min(int(keypoints[:, 0].max()) + margin, frame_width)
+    y2 = min(int(keypoints[:, 1].max()) + margin, frame_height)
+    return (x1, y1, x2, y2)
+
+def frame_changed(reference_frame, frame, roi, pixel_threshold=25, min_changed_fraction=0.002):
+    """
+    Whether anything moved inside roi between two frames
+
+    A fraction of changed pixels is used instead of the mean difference,
+    so a player moving on a large, otherwise static court still counts as
+    a change.
+
+    Args:
+        reference_frame: Frame the current detections belong to
+        frame: New frame
+        roi: (x1, y1, x2, y2) area to compare
+        pixel_threshold: Grey level difference for a pixel to count as changed
+        min_changed_fraction: Fraction of changed pixels that counts as a change
+
+    Returns:
+        True if the frame needs new detections
+    """
+    x1, y1, x2, y2 = roi
+    difference = cv2.absdiff(cv2.cvtColor(reference_frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY),
+                             cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY))
+    changed_pixels = cv2.countNonZero(cv2.threshold(difference, pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+    return changed_pixels > min_changed_fraction * difference.size
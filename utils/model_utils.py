@@ -0,0 +1,148 @@
+import contextlib
+import os
+
+# Exported formats checked next to the weights, fastest first
+EXPORTED_MODEL_FORMATS = ['engine', 'onnx']
+
+def get_exported_model_path(model_path, model_format='engine'):
+    root, _ = os.path.splitext(model_path)
+    return f"{root}.{model_format}"
+
+def resolve_model_path(model_path):
+    """
+    Prefer an exported TensorRT engine or ONNX model over the PyTorch weights
+
+    Args:
+        model_path: Path to the .pt weights (or an ultralytics model name)
+
+    Returns:
+        Path of the first exported model next to the weights that exists
+        (.engine, then .onnx), else model_path
+    """
+    for model_format in EXPORTED_MODEL_FORMATS:
+        exported_model_path = get_exported_model_path(model_path, model_format)
+        if exported_model_path != model_path and os.path.exists(exported_model_path):
+            return exported_model_path
+    return model_path
+
+def use_channels_last(model, cudnn_benchmark=False):
+    """
+    Run the convolutions of a PyTorch YOLO model in NHWC (channels_last) layout
+
+    cuDNN has faster NHWC kernels on Tensor Cores. The weights are converted
+    once the predictor has set up (and fused) the model, so the fused layers
+    keep the layout, and every preprocessed input batch is converted too so
+    the first convolution doesn't run a layout transform. Exported engines /
+    ONNX models are left alone, they bind contiguous NCHW buffers.
+    ultralytics already runs the forward pass under torch.inference_mode.
+
+    cuDNN benchmark mode autotunes once per input shape, which only pays off
+    when calls have a fixed batch size. The trackers' batches vary with the
+    court-change gating and key-frame stride, so it stays off by default.
+
+    Args:
+        model: Loaded ultralytics YOLO model
+        cudnn_benchmark: Enable cuDNN benchmark mode (process-wide) for
+            workloads whose batch shapes don't change
+
+    Returns:
+        The same model
+    """
+    import torch
+
+    if cudnn_benchmark:
+        torch.backends.cudnn.benchmark = True
+
+    def on_predict_start(predictor):
+        if getattr(predictor, 'channels_last', False):
+            return
+        predictor.channels_last = True
+        backend = predictor.model
+        if not isinstance(getattr(backend, 'model', None), torch.nn.Module):
+            return
+        backend.model.to(memory_format=torch.channels_last)
+
+        preprocess = predictor.preprocess
+
+        def preprocess_channels_last(im):
+            return preprocess(im).contiguous(memory_format=torch.channels_last)
+
+        predictor.preprocess = preprocess_channels_last
+
+    model.add_callback('on_predict_start', on_predict_start)
+    return model
+
+def use_half_precision():
+    """
+    Whether YOLO calls should pass half=True
+
+    FP16 halves the activation memory traffic and runs on Tensor Cores. It
+    only applies on CUDA; exported engines keep the precision they were built
+    with.
+
+    Returns:
+        True when a CUDA GPU is available
+    """
+    import torch
+
+    return torch.cuda.is_available()
+
+def create_cuda_stream():
+    """
+    A CUDA stream of its own for one detector, or None without CUDA
+
+    The trackers run on separate threads; on separate streams the copies
+    and kernels of one model can overlap with the other's instead of
+    queueing behind them on the default stream.
+
+    Returns:
+        torch.cuda.Stream, or None when no CUDA GPU is available
+    """
+    import torch
+
+    return torch.cuda.Stream() if torch.cuda.is_available() else None
+
+def cuda_stream_context(stream):
+    """
+    Make stream the current CUDA stream of this thread, a no-op for None
+
+    Everything that touches the model's tensors, including moving the
+    results to the CPU, has to run inside the context so it stays ordered
+    on the same stream.
+    """
+    if stream is None:
+        return contextlib.nullcontext()
+
+    import torch
+
+    return torch.cuda.stream(stream)
+
+def export_engine_if_missing(model_path, batch=32, imgsz=640):
+    """
+    Build a dynamic-batch TensorRT FP16 engine next to the weights once
+
+    Only runs when a CUDA GPU is available and no engine exists yet;
+    afterwards the cached engine is picked up by resolve_model_path. A
+    failed export (e.g. TensorRT not installed) falls back to the weights.
+
+    Args:
+        model_path: Path to the .pt weights (or an ultralytics model name)
+        batch: Max batch size the engine accepts
+        imgsz: Inference image size the engine is built for
+
+    Returns:
+        Path of the model the trackers should load
+    """
+    import torch
+
+    if not torch.cuda.is_available() or os.path.exists(get_exported_model_path(model_path, 'engine')):
+        return resolve_model_path(model_path)
+
+    from ultralytics import YOLO
+
+    print(f"Exporting {model_path} to a TensorRT FP16 engine (one time)...")
+    try:
+        return YOLO(model_path).export(format='engine', half=True, dynamic=True, batch=batch, imgsz=imgsz)
+    except Exception as e:
+        print(f"TensorRT export failed ({e}), using {model_path}")
+        return resolve_model_path(model_path)
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import sys
+sys.path.append('../')
+import constants
+from .fast_geom import measure_distances, pixel_distances_to_meters
+
+def carry_forward(values, mask):
+    """
+    For every position, the value of the last position where mask is set
+    (0 before the first one), without building an intermediate Series
+    """
+    last_index = np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+    return np.where(last_index >= 0, values[np.maximum(last_index, 0)], 0.0)
+
+def get_player_stats_data(ball_shot_frames, player_mini_court_detections, ball_mini_court_detections, mini_court_width, fps=24):
+    """
+    Compute the running player statistics at every ball shot
+
+    All shots are processed at once as NumPy arrays: positions are gathered
+    into (frames, players, 2) / (frames, 2) arrays, shot and opponent speeds
+    are computed for every shot in one go and the running totals come from
+    cumulative sums instead of copying the previous row per shot.
+
+    Args:
+        ball_shot_frames: Sorted frame numbers of the detected ball shots
+        player_mini_court_detections: Per-frame dicts of player id -> mini court position
+        ball_mini_court_detections: Per-frame dicts of 1 -> mini court ball position
+        mini_court_width: Width of the mini court in pixels
+        fps: Frame rate used to turn frame differences into seconds
+
+    Returns:
+        DataFrame with one row per counted shot (plus the initial frame 0 row)
+    """
+    num_frames = len(player_mini_court_detections)
+
+    # Map the (at most two) tracked player IDs to player 1 and 2 once
+    player_ids = sorted({player_id for player_dict in player_mini_court_detections for player_id in player_dict})[:2]
+
+    player_positions = np.full((num_frames, 2, 2), np.nan)
+    ball_positions = np.full((num_frames, 2), np.nan)
+    for frame_num, player_dict in enumerate(player_mini_court_detections):
+        for player_index, player_id in enumerate(player_ids):
+            if player_id in player_dict:
+                player_positions[frame_num, player_index] = player_dict[player_id]
+    for frame_num, ball_dict in enumerate(ball_mini_court_detections[:num_frames]):
+        if 1 in ball_dict:
+            ball_positions[frame_num] = ball_dict[1]
+
+    start_frames = np.asarray(ball_shot_frames[:-1], dtype=int)
+    end_frames = np.asarray(ball_shot_frames[1:], dtype=int)
+
+    # Skip shots beyond our limited frame range
+    in_range = (start_frames < num_frames) & (end_frames < num_frames)
+    start_frames = start_frames[in_range]
+    end_frames = end_frames[in_range]
+
+    # The player closest to the ball hit it, the other one is the opponent
+    start_player_positions = player_positions[start_frames].reshape(-1, 2)
+    start_ball_positions = np.repeat(ball_positions[start_frames], 2, axis=0)
+    distances_to_ball = measure_distances(start_player_positions, start_ball_positions).reshape(-1, 2)
+    both_players_at_start = ~np.isnan(distances_to_ball).any(axis=1)
+    player_shot_ball = np.argmin(np.where(np.isnan(distances_to_ball), np.inf, distances_to_ball), axis=1)
+    opponent_player = 1 - player_shot_ball
+
+    # The opponent has to be in both frames to measure how far they ran
+    opponent_start_positions = player_positions[start_frames, opponent_player]
+    opponent_end_positions = player_positions[end_frames, opponent_player]
+    opponent_at_end = ~np.isnan(opponent_end_positions).any(axis=1)
+
+    valid_shots = both_players_at_start & opponent_at_end
+    skipped_shots = len(valid_shots) - int(valid_shots.sum())
+    if skipped_shots:
+        print(f"Skipping {skipped_shots} of {len(valid_shots)} shots: insufficient player data")
+
+    start_frames = start_frames[valid_shots]
+    end_frames = end_frames[valid_shots]
+    player_shot_ball = player_shot_ball[valid_shots]
+    opponent_player = opponent_player[valid_shots]
+
+    ball_shot_time_in_seconds = (end_frames - start_frames) / fps
+
+    # Speed of the ball shots in km/h
+    distance_covered_by_ball_pixels = measure_distances(ball_positions[start_frames], ball_positions[end_frames])
+    distance_covered_by_ball_meters = pixel_distances_to_meters(distance_covered_by_ball_pixels,
+                                                                constants.DOUBLE_LINE_WIDTH,
+                                                                mini_court_width)
+    speed_of_ball_shot = distance_covered_by_ball_meters / ball_shot_time_in_seconds * 3.6
+
+    # Speed of the opponents in km/h
+    distance_covered_by_opponent_pixels = measure_distances(opponent_start_positions[valid_shots], opponent_end_positions[valid_shots])
+    distance_covered_by_opponent_meters = pixel_distances_to_meters(distance_covered_by_opponent_pixels,
+                                                                    constants.DOUBLE_LINE_WIDTH,
+                                                                    mini_court_width)
+    speed_of_opponent = distance_covered_by_opponent_meters / ball_shot_time_in_seconds * 3.6
+
+    # Running totals per shot; the first row is the zero state at frame 0
+    player_stats_data = {'frame_num': np.concatenate(([0], start_frames))}
+    for player_index in range(2):
+        player_number = player_index + 1
+        shot_mask = player_shot_ball == player_index
+        opponent_mask = opponent_player == player_index
+
+        shot_speeds = np.where(shot_mask, speed_of_ball_shot, 0.0)
+        opponent_speeds = np.where(opponent_mask, speed_of_opponent, 0.0)
+        last_shot_speed = carry_forward(speed_of_ball_shot, shot_mask)
+        last_player_speed = carry_forward(speed_of_opponent, opponent_mask)
+
+        player_stats_data[f'player_{player_number}_number_of_shots'] = np.concatenate(([0], np.cumsum(shot_mask)))
+        player_stats_data[f'player_{player_number}_total_shot_speed'] = np.concatenate(([0.0], np.cumsum(shot_speeds)))
+        player_stats_data[f'player_{player_number}_last_shot_speed'] = np.concatenate(([0.0], last_shot_speed))
+        player_stats_data[f'player_{player_number}_total_player_speed'] = np.concatenate(([0.0], np.cumsum(opponent_speeds)))
+        player_stats_data[f'player_{player_number}_last_player_speed'] = np.concatenate(([0.0], last_player_speed))
+
+    return pd.DataFrame(player_stats_data)
+
+def expand_player_stats_to_frames(player_stats_data_df, num_frames):
+    """
+    Give every frame the stats of the last shot up to that frame, and add the
+    average speed columns
+
+    The shot rows are sorted by frame_num, so the row for each frame is found
+    with one searchsorted and gathered with a single take.
+
+    Args:
+        player_stats_data_df: Shot rows from get_player_stats_data
+        num_frames: Number of frames in the output video
+
+    Returns:
+        DataFrame with one row per frame
+    """
+    shot_frames = player_stats_data_df['frame_num'].to_numpy()
+    row_index = np.searchsorted(shot_frames, np.arange(num_frames), side='right') - 1
+    player_stats_data = {'frame_num': np.arange(num_frames)}
+    for column in player_stats_data_df.columns.drop('frame_num'):
+        player_stats_data[column] = player_stats_data_df[column].to_numpy()[row_index]
+
+    # Averages are 0 until a player has hit a shot
+    for player_number in (1, 2):
+        number_of_shots = player_stats_data[f'player_{player_number}_number_of_shots']
+        for total_column, average_column in (('total_shot_speed', 'average_shot_speed'),
+                                             ('total_player_speed', 'average_player_speed')):
+            total = player_stats_data[f'player_{player_number}_{total_column}'].astype(np.float64)
+            player_stats_data[f'player_{player_number}_{average_column}'] = np.divide(total, number_of_shots,
+                                                                                      out=np.zeros_like(total),
+                                                                                      where=number_of_shots > 0)
+
+    return pd.DataFrame(player_stats_data)
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import pickle
+import numpy as np
+
+# zstandard is optional; it is only needed for stubs saved with a .zst suffix
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+def check_zstd_stub(stub_path):
+    # True when the stub should go through zstd compression
+    if not stub_path.endswith('.zst'):
+        return False
+    if not ZSTD_AVAILABLE:
+        raise ImportError(f"zstandard is required for the compressed stub {stub_path}")
+    return True
+
+def read_stub(stub_path):
+    with open(stub_path, 'rb') as f:
+        if check_zstd_stub(stub_path):
+            with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                return pickle.load(reader)
+        return pickle.load(f)
+
+def save_stub(obj, stub_path):
+    with open(stub_path, 'wb') as f:
+        if check_zstd_stub(stub_path):
+            with zstandard.ZstdCompressor().stream_writer(f) as writer:
+                pickle.dump(obj, writer, protocol=pickle.HIGHEST_PROTOCOL)
+            return
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def get_stub_key(*parts):
+    """
+    Short content key for a stub, e.g. from (model_path, video_path, start, end, step)
+    """
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+def get_file_fingerprint(path, num_bytes=1 << 20):
+    """
+    Cheap fingerprint of a file's contents for stub keys
+
+    Hashes the file size, modification time and first num_bytes, so
+    replacing the video or retraining the weights at the same path gives a
+    new key without reading the whole file.
+
+    Args:
+        path: Path of the file (an ultralytics model name is returned as is)
+        num_bytes: Number of leading bytes to hash
+
+    Returns:
+        str: Fingerprint of the file
+    """
+    if not os.path.isfile(path):
+        return path
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        head_digest = hashlib.sha1(f.read(num_bytes)).hexdigest()
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{head_digest}"
+
+def save_detections_npz(detections, stub_path):
+    """
+    Save per-frame detection dicts ({id: [x1, y1, x2, y2]}) as flat arrays
+
+    Args:
+        detections: List with one dict of id -> bbox per frame
+        stub_path: Path of the .npz file
+    """
+    frame_idx = [frame_num for frame_num, detection_dict in enumerate(detections) for _ in detection_dict]
+    ids = [track_id for detection_dict in detections for track_id in detection_dict]
+    boxes = [bbox for detection_dict in detections for bbox in detection_dict.values()]
+    np.savez_compressed(stub_path,
+                        num_frames=len(detections),
+                        frame_idx=np.array(frame_idx, dtype=np.int64),
+                        ids=np.array(ids, dtype=np.int64),
+                        boxes=np.array(boxes, dtype=np.float64).reshape(-1, 4))
+
+def read_detections_npz(stub_path):
+    """
+    Rebuild the per-frame detection dicts saved by save_detections_npz
+
+    Args:
+        stub_path: Path of the .npz file
+
+    Returns:
+        List with one dict of id -> bbox per frame
+    """
+    with np.load(stub_path) as stub:
+        detections = [{} for _ in range(int(stub['num_frames']))]
+        for frame_num, track_id, bbox in zip(stub['frame_idx'].tolist(), stub['ids'].tolist(), stub['boxes'].tolist()):
+            detections[frame_num][track_id] = bbox
+    return detections
@@ -1,4 +1,23 @@
 import cv2
+import queue
+import shutil
+import subprocess
+import threading
+import numpy as np
+
+# PyAV decodes with FFmpeg's frame/slice threads; OpenCV's reader is used without it
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+# NVDEC decoding through PyAV (>= 14) when FFmpeg was built with CUDA
+try:
+    from av.codec.hwaccel import HWAccel, hwdevices_available
+    NVDEC_AVAILABLE = 'cuda' in hwdevices_available()
+except ImportError:
+    NVDEC_AVAILABLE = False
 
 def read_video(video_path):
     cap = cv2.VideoCapture(video_path)
@@ -46,9 +65,9 @@ def read_video_limited(video_path, max_frames=None, start_frame=0):
     cap.release()
     return frames
 
-def read_video_sampled(video_path, frame_step=10, max_frames=None, start_frame=0, end_frame=None):
+def iter_video_sampled(video_path, frame_step=10, max_frames=None, start_frame=0, end_frame=None):
     """
-    Read video frames with sampling
+    Yield video frames with sampling, one at a time
     
     Args:
         video_path: Path to video file
@@ -57,9 +76,13 @@ def read_video_sampled(video_path, frame_step=10, max_frames=None, start_frame=0
         start_frame: Starting frame number (default: 0)
         end_frame: Ending frame number (None for end of video)
     
-    Returns:
-        List of sampled frames
+    Yields:
+        Sampled frames
     """
+    if AV_AVAILABLE:
+        yield from iter_video_sampled_av(video_path, frame_step, max_frames, start_frame, end_frame)
+        return
+
     cap = cv2.VideoCapture(video_path)
     
     # Get total frame count if end_frame is not specified
@@ -67,28 +90,122 @@ def read_video_sampled(video_path, frame_step=10, max_frames=None, start_frame=0
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         end_frame = total_frames
     
-    frames = []
-    current_frame = start_frame
+    frame_count = 0
     
-    while current_frame < end_frame:
-        # Set frame position
-        cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-        ret, frame = cap.read()
-        
-        if not ret:
-            break
-            
-        frames.append(frame)
-        
-        # Check if we've reached max_frames limit
-        if max_frames is not None and len(frames) >= max_frames:
-            break
+    try:
+        # Seek once, then grab() skipped frames so only sampled frames are
+        # converted to BGR and copied out by retrieve()
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        for current_frame in range(start_frame, end_frame):
+            if not cap.grab():
+                break
+            if (current_frame - start_frame) % frame_step:
+                continue
+
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+                
+            yield frame
+            frame_count += 1
             
-        # Move to next sampled frame
-        current_frame += frame_step
+            # Check if we've reached max_frames limit
+            if max_frames is not None and frame_count >= max_frames:
+                break
+    finally:
+        cap.release()
+
+def open_av_container(video_path):
+    if NVDEC_AVAILABLE:
+        try:
+            return av.open(video_path, hwaccel=HWAccel('cuda', allow_software_fallback=True))
+        except av.FFmpegError:
+            # No usable CUDA device, decode on the CPU
+            pass
+    return av.open(video_path)
+
+def iter_video_sampled_av(video_path, frame_step=10, max_frames=None, start_frame=0, end_frame=None):
+    """
+    Yield sampled video frames decoded by PyAV on all cores
+
+    Seeks once to the keyframe before start_frame and decodes forward,
+    keeping every frame_step-th frame, instead of seeking for every frame.
+    Decoding runs on NVDEC when a CUDA device can be opened; the frames are
+    downloaded to host memory because the drawing stage needs numpy arrays.
+
+    Args:
+        video_path: Path to video file
+        frame_step: Step size for sampling (e.g., 10 = every 10th frame)
+        max_frames: Maximum number of frames to read (None for all)
+        start_frame: Starting frame number (default: 0)
+        end_frame: Ending frame number (None for end of video)
+
+    Yields:
+        Sampled BGR frames, like cv2.VideoCapture.read
+    """
+    container = open_av_container(video_path)
+    try:
+        stream = container.streams.video[0]
+        stream.thread_type = 'AUTO'
+        fps = float(stream.average_rate)
+        start_pts = stream.start_time or 0
+
+        if start_frame > 0:
+            container.seek(start_pts + int(start_frame / fps / stream.time_base), stream=stream)
+
+        frame_count = 0
+        for frame in container.decode(stream):
+            frame_num = int(round((frame.pts - start_pts) * stream.time_base * fps))
+            if frame_num < start_frame or (frame_num - start_frame) % frame_step:
+                continue
+            if end_frame is not None and frame_num >= end_frame:
+                break
+
+            yield frame.to_ndarray(format='bgr24')
+            frame_count += 1
+
+            if max_frames is not None and frame_count >= max_frames:
+                break
+    finally:
+        container.close()
+
+def read_video_sampled(video_path, frame_step=10, max_frames=None, start_frame=0, end_frame=None):
+    """
+    Read video frames with sampling
     
-    cap.release()
-    return frames
+    Args:
+        video_path: Path to video file
+        frame_step: Step size for sampling (e.g., 10 = every 10th frame)
+        max_frames: Maximum number of frames to read (None for all)
+        start_frame: Starting frame number (default: 0)
+        end_frame: Ending frame number (None for end of video)
+    
+    Returns:
+        List of sampled frames
+    """
+    return list(iter_video_sampled(video_path, frame_step=frame_step, max_frames=max_frames,
+                                   start_frame=start_frame, end_frame=end_frame))
+
+def batch_frames(frames, batch_size):
+    """
+    Group an iterable of frames into lists of at most batch_size frames
+    
+    Args:
+        frames: Iterable of frames (list or generator)
+        batch_size: Number of frames per batch
+    
+    Yields:
+        Lists of frames
+    """
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 def get_video_info(video_path):
     """
@@ -118,9 +235,177 @@ def get_video_info(video_path):
         'duration': duration
     }
 
-def save_video(output_video_frames, output_video_path):
-    fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-    out = cv2.VideoWriter(output_video_path, fourcc, 24, (output_video_frames[0].shape[1], output_video_frames[0].shape[0]))
+def prefetch(iterable, maxsize=4):
+    """
+    Consume an iterable on a background thread so the next items are
+    produced (e.g. decoded) while the caller works on the current one
+    
+    Args:
+        iterable: Iterable to consume (e.g. a frame or batch generator)
+        maxsize: Maximum number of items buffered ahead of the caller
+    
+    Yields:
+        Items of the iterable, in order
+    """
+    end_of_stream = object()
+    buffer = queue.Queue(maxsize=maxsize)
+
+    def producer():
+        try:
+            for item in iterable:
+                buffer.put(item)
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            buffer.put(end_of_stream)
+
+    threading.Thread(target=producer, daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is end_of_stream:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+class BackgroundVideoWriter:
+    """
+    Wraps a video writer so frames are encoded on a background thread.
+    write() only blocks once maxsize frames are waiting to be encoded. An
+    error in the writer thread (e.g. ffmpeg exiting) is raised again from
+    the next write() or release() instead of leaving them blocked.
+    """
+    def __init__(self, video_writer, maxsize=32):
+        self.video_writer = video_writer
+        self.frames = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._write_frames, daemon=True)
+        self.thread.start()
+
+    def _write_frames(self):
+        try:
+            while True:
+                frame = self.frames.get()
+                if frame is None:
+                    break
+                self.video_writer.write(frame)
+        except Exception as e:
+            self.error = e
+
+    def _raise_if_failed(self):
+        if self.error is not None:
+            raise self.error
+        if not self.thread.is_alive():
+            raise RuntimeError("Background video writer thread is no longer running")
+
+    def _put(self, item):
+        # Wait in short steps so a dead writer thread is noticed while the queue is full
+        while True:
+            self._raise_if_failed()
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def write(self, frame):
+        self._put(frame)
+
+    def release(self):
+        try:
+            self._put(None)
+            self.thread.join()
+            if self.error is not None:
+                raise self.error
+        except Exception:
+            # Still close the underlying writer, but report the original error
+            try:
+                self.video_writer.release()
+            except Exception:
+                pass
+            raise
+        self.video_writer.release()
+
+def get_ffmpeg_exe():
+    # The binary bundled with imageio-ffmpeg, else one on the PATH
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which('ffmpeg')
+
+class FFmpegVideoWriter:
+    """
+    Streams raw BGR frames into an ffmpeg process over an unbuffered pipe.
+    Has the write() / release() interface of cv2.VideoWriter.
+    """
+    def __init__(self, output_video_path, frame_size, fps=24, codec='libx264', ffmpeg_exe=None):
+        width, height = frame_size
+        command = [ffmpeg_exe or get_ffmpeg_exe(), '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+                   '-c:v', codec, '-pix_fmt', 'yuv420p']
+        if codec == 'libx264':
+            command += ['-preset', 'ultrafast']
+        command.append(output_video_path)
+        self.output_video_path = output_video_path
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, bufsize=0)
+
+    def isOpened(self):
+        return self.process.poll() is None
+
+    def write(self, frame):
+        # Hand the frame's buffer to the pipe without an intermediate bytes copy.
+        # The unbuffered pipe may take only part of it per call, so keep writing
+        # the rest; a dropped tail would shift every later frame
+        frame_bytes = memoryview(np.ascontiguousarray(frame)).cast('B')
+        while frame_bytes:
+            frame_bytes = frame_bytes[self.process.stdin.write(frame_bytes):]
+
+    def release(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to write {self.output_video_path}")
+
+def open_video_writer(output_video_path, frame_size, fps=24):
+    """
+    Open a video writer, trying the fastest H.264 encoder first
+
+    .mp4 outputs are piped into ffmpeg's libx264 when an ffmpeg binary is
+    available; otherwise cv2.VideoWriter tries H.264 (NVENC or x264
+    depending on how OpenCV was built), then mp4v. Anything else is
+    written as MJPG.
+
+    Args:
+        output_video_path: Path of the output video
+        frame_size: (width, height) of the frames
+        fps: Frame rate of the output video
+
+    Returns:
+        Opened FFmpegVideoWriter or cv2.VideoWriter
+    """
+    if output_video_path.lower().endswith('.mp4'):
+        ffmpeg_exe = get_ffmpeg_exe()
+        if ffmpeg_exe is not None:
+            return FFmpegVideoWriter(output_video_path, frame_size, fps, ffmpeg_exe=ffmpeg_exe)
+        codecs = ['avc1', 'H264', 'mp4v']
+    else:
+        codecs = ['MJPG']
+    for codec in codecs:
+        video_writer = cv2.VideoWriter(output_video_path, cv2.VideoWriter_fourcc(*codec), fps, frame_size)
+        if video_writer.isOpened():
+            return video_writer
+        video_writer.release()
+    raise RuntimeError(f"Could not open a video writer for {output_video_path} (tried {', '.join(codecs)})")
+
+def save_video(output_video_frames, output_video_path, fps=24):
+    # output_video_frames may be any iterable (e.g. a generator of drawn frames);
+    # the writer is opened on the first frame, whose shape gives the frame size
+    out = None
     for frame in output_video_frames:
+        if out is None:
+            out = open_video_writer(output_video_path, (frame.shape[1], frame.shape[0]), fps)
         out.write(frame)
+    if out is None:
+        print(f"No frames to write to {output_video_path}")
+        return
     out.release()
\ No newline at end of file